@@ -1,50 +1,125 @@
 import pygame
 import os
+from bisect import bisect_right
 from pathlib import Path
+import asset_loader
+from settings import FPS
 
 
-class Animation:
-    def __init__(self, frames, frame_duration=5, loop=True):
-        self.frames = frames  # список изображений
-        self.frame_duration = frame_duration  # кадров на один спрайт
-        self.loop = loop
-        self.current_frame = 0
-        self.timer = 0
-        self.finished = False
+class AnimationClock:
+    """Общие часы анимаций: один счётчик тиков на всю игру"""
+
+    def __init__(self):
+        self.ticks = 0
+
+    def tick(self):
+        self.ticks += 1
+
+    def reset(self):
+        self.ticks = 0
 
-    def update(self):
-        if self.finished and not self.loop:
-            return
 
-        self.timer += 1
-        if self.timer >= self.frame_duration:
-            self.timer = 0
-            self.current_frame += 1
+# Часы по умолчанию, их продвигает Game.update
+shared_clock = AnimationClock()
 
-            if self.current_frame >= len(self.frames):
-                if self.loop:
-                    self.current_frame = 0
-                else:
-                    self.current_frame = len(self.frames) - 1
-                    self.finished = True
+
+class Animation:
+    """Анимация по времени: кадр вычисляется из общих часов и момента старта"""
+
+    def __init__(self, frames=None, frame_duration=5, loop=True, loader=None, clock=None):
+        self._frames = frames  # список изображений (None - ещё не загружены)
+        self.loader = loader  # функция, загружающая кадры при первом play()
+        self.frame_duration = frame_duration  # тиков на один спрайт
+        self.loop = loop
+        self.clock = clock or shared_clock
+        self.start_tick = self.clock.ticks
+
+    @property
+    def frames(self):
+        if self._frames is None:
+            self._frames = self.loader() if self.loader else []
+            self.loader = None
+        return self._frames
+
+    @frames.setter
+    def frames(self, frames):
+        self._frames = frames
+
+    @property
+    def loaded(self):
+        return self._frames is not None
+
+    def _position(self):
+        return (self.clock.ticks - self.start_tick) // self.frame_duration
+
+    @property
+    def current_frame(self):
+        count = len(self.frames)
+        if count == 0:
+            return 0
+        position = self._position()
+        if self.loop:
+            return position % count
+        return min(position, count - 1)
+
+    @property
+    def finished(self):
+        return not self.loop and self._position() >= len(self.frames)
 
     def get_current_frame(self):
-        return self.frames[self.current_frame]
+        frames = self.frames
+        if not frames:
+            return None
+        return frames[self.current_frame]
 
     def reset(self):
-        self.current_frame = 0
-        self.timer = 0
-        self.finished = False
+        self.start_tick = self.clock.ticks
+
+
+class TileAnimation:
+    """Анимированный тайл Tiled: один текущий кадр на все экземпляры этого GID.
+    Кадр считается по общим часам не чаще раза за тик"""
+
+    def __init__(self, frames, durations_ms, clock=None):
+        self.clock = clock or shared_clock
+        self._tick = None
+        self._image = None
+        self.set_frames(frames, durations_ms)
+
+    def set_frames(self, frames, durations_ms):
+        """Замена кадров на месте (горячая перезагрузка тайлсета)"""
+        self.frames = frames
+        # Длительности Tiled в миллисекундах переводятся в тики часов
+        self.ends = []
+        total = 0
+        for duration in durations_ms:
+            total += max(1, round(duration * FPS / 1000))
+            self.ends.append(total)
+        self.period = total
+        self._tick = None
+
+    @property
+    def image(self):
+        ticks = self.clock.ticks
+        if ticks != self._tick:
+            self._tick = ticks
+            self._image = self.frames[bisect_right(self.ends, ticks % self.period)]
+        return self._image
 
 
 class AnimationManager:
-    def __init__(self):
+    def __init__(self, clock=None):
         self.animations = {}
         self.current_animation = None
         self.current_name = ""
+        self.clock = clock or shared_clock
+        # Масштабирование кадров при загрузке (выполняется в фоновых потоках)
+        self.frame_size = None
+        self.frame_scale = None
+        self._files = {}
 
     def add_animation(self, name, frames, frame_duration=5, loop=True):
-        self.animations[name] = Animation(frames, frame_duration, loop)
+        self.animations[name] = Animation(frames, frame_duration, loop, clock=self.clock)
 
     def play(self, name, force_restart=False):
         if name == self.current_name and not force_restart:
@@ -55,18 +130,13 @@ class AnimationManager:
             self.current_animation = self.animations[name]
             self.current_animation.reset()
 
-    def update(self):
-        if self.current_animation:
-            self.current_animation.update()
-
     def get_current_frame(self):
         if self.current_animation:
             return self.current_animation.get_current_frame()
         return None
 
     def load_from_directory(self, base_path, animation_name, frame_duration=5, loop=True):
-        """Загружает анимацию из папки с изображениями"""
-        frames = []
+        """Объявляет анимацию из папки с изображениями, кадры загружаются при первом play()"""
         path = Path(base_path) / animation_name
 
         if not path.exists():
@@ -74,17 +144,32 @@ class AnimationManager:
             return
 
         # Сортируем файлы по имени
-        files = sorted([f for f in path.iterdir() if f.suffix in ['.png', '.jpg', '.bmp']])
+        files = asset_loader.list_images(path)
 
-        for file in files:
-            try:
-                image = pygame.image.load(str(file)).convert_alpha()
-                frames.append(image)
-            except pygame.error as e:
-                print(f"Ошибка загрузки {file}: {e}")
+        if not files:
+            print(f"Нет изображений в {path}")
+            return
 
-        if frames:
-            self.add_animation(animation_name, frames, frame_duration, loop)
+        def load_frames():
+            # Все кадры декодируются параллельно, здесь только ожидание и convert_alpha
+            self.prefetch(animation_name)
+            frames = []
+            for file in files:
+                try:
+                    frames.append(asset_loader.get_image(file, self.frame_size, self.frame_scale))
+                except pygame.error as e:
+                    print(f"Ошибка загрузки {file}: {e}")
             print(f"Загружена анимация '{animation_name}': {len(frames)} кадров")
-        else:
-            print(f"Нет изображений в {path}")
\ No newline at end of file
+            return frames
+
+        self._files[animation_name] = files
+        self.animations[animation_name] = Animation(
+            None, frame_duration, loop, loader=load_frames, clock=self.clock)
+
+    def prefetch(self, *names):
+        """Запускает фоновое декодирование кадров и возвращает список Future"""
+        futures = []
+        for name in names or self._files.keys():
+            for file in self._files.get(name, []):
+                futures.append(asset_loader.load_image_async(file, self.frame_size, self.frame_scale))
+        return futures
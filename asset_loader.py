@@ -0,0 +1,111 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+import pygame
+from settings import ASSET_LOADER_WORKERS
+import surfaces
+
+IMAGE_SUFFIXES = ('.png', '.jpg', '.bmp')
+
+_executor = None
+_lock = threading.Lock()
+_futures = {}  # ключ -> Future с декодированной (ещё не конвертированной) поверхностью
+_converted = {}  # ключ -> поверхность, подготовленная surfaces.prepare
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=ASSET_LOADER_WORKERS,
+                                       thread_name_prefix="asset-loader")
+    return _executor
+
+
+def _scaled_size(surface, size, scale):
+    if size is not None:
+        return tuple(size)
+    if scale is not None and scale != 1:
+        return (max(1, round(surface.get_width() * scale)),
+                max(1, round(surface.get_height() * scale)))
+    return None
+
+
+def _decode(path, size, scale):
+    """Декодирование и масштабирование в фоновом потоке (pygame отпускает GIL)"""
+    surface = pygame.image.load(path)
+    target = _scaled_size(surface, size, scale)
+    if target is not None and target != surface.get_size():
+        surface = pygame.transform.scale(surface, target)
+    return surface
+
+
+def _key(path, size, scale):
+    return (str(path), tuple(size) if size is not None else None, scale)
+
+
+def load_image_async(path, size=None, scale=None):
+    """Ставит картинку в очередь на декодирование. Повторный запрос отдаёт тот же Future"""
+    key = _key(path, size, scale)
+    if key in _converted:
+        return completed(_converted[key])
+    with _lock:
+        future = _futures.get(key)
+        if future is None:
+            future = _get_executor().submit(_decode, str(path), size, scale)
+            _futures[key] = future
+    return future
+
+
+def completed(result):
+    """Уже завершённый Future (для единообразия с фоновыми задачами)"""
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def list_images(directory):
+    """Файлы изображений папки, отсортированные по имени"""
+    path = Path(directory)
+    if not path.exists():
+        return []
+    return sorted(f for f in path.iterdir() if f.suffix in IMAGE_SUFFIXES)
+
+
+def preload_directory(directory, size=None, scale=None):
+    """Запускает фоновую загрузку картинок папки и возвращает список Future"""
+    return [load_image_async(file, size, scale) for file in list_images(directory)]
+
+
+def get_image(path, size=None, scale=None):
+    """Готовая поверхность: ждёт декодирования, подготовка к blit - только в главном потоке"""
+    key = _key(path, size, scale)
+    surface = _converted.get(key)
+    if surface is None:
+        surface = surfaces.prepare(load_image_async(path, size, scale).result())
+        _converted[key] = surface
+        with _lock:
+            _futures.pop(key, None)  # сырая копия больше не нужна
+    return surface
+
+
+def scale_async(surface, size):
+    """Масштабирование уже загруженной поверхности в фоновом потоке"""
+    return _get_executor().submit(pygame.transform.scale, surface, size)
+
+
+def run_async(function, *args):
+    """Любая работа без pygame-дисплея (например, разбор XML) в пуле загрузчика"""
+    return _get_executor().submit(function, *args)
+
+
+def wait_all(futures, timeout=None):
+    """True, если все задачи завершились"""
+    done, not_done = wait(futures, timeout=timeout)
+    return not not_done
+
+
+def progress(futures):
+    """Доля завершённых задач (для экрана загрузки)"""
+    if not futures:
+        return 1.0
+    return sum(1 for f in futures if f.done()) / len(futures)
@@ -0,0 +1,396 @@
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+import pygame
+from settings import (BASE_DIR, SCREEN_WIDTH, SCREEN_HEIGHT, NPC_ASSETS_DIR,
+                      BENCHMARK_FRAMES, BENCHMARK_WARMUP, BENCHMARK_RESULTS_PATH,
+                      BENCHMARK_BASELINE_RUNS, BENCHMARK_BASELINE_MIN_RUNS,
+                      BENCHMARK_REGRESSION_RATIO, BENCHMARK_NOISE_SIGMAS,
+                      BENCHMARK_BLIT_REPEATS, BENCHMARK_BLIT_SURFACES)
+import surfaces
+
+Scenario = namedtuple("Scenario", ["tiles", "npcs", "projectiles", "particles"])
+
+# Число непустых тайлов карты и размер популяций
+SCENARIOS = {
+    "tiles_1k": Scenario(1_000, 1, 0, 0),
+    "tiles_10k": Scenario(10_000, 1, 0, 0),
+    "tiles_100k": Scenario(100_000, 1, 0, 0),
+    # Маска уровня занимает бит на пиксель всего уровня: нужно несколько ГБ памяти
+    "tiles_1m": Scenario(1_000_000, 1, 0, 0),
+    "npcs_100": Scenario(10_000, 100, 0, 0),
+    "npcs_1k": Scenario(10_000, 1_000, 0, 0),
+    "npcs_10k": Scenario(10_000, 10_000, 0, 0),
+    "projectiles_5k": Scenario(10_000, 1, 5_000, 0),
+    "particles_10k": Scenario(10_000, 1, 0, 10_000),
+}
+DEFAULT_SCENARIOS = ("tiles_1k", "tiles_10k", "tiles_100k", "npcs_100", "npcs_1k",
+                     "projectiles_5k", "particles_10k")
+
+MAP_HEIGHT = 30
+GROUND_ROWS = 6
+TILESET_COLUMNS = 4
+LONG_LIFETIME = 30000  # тиков: снаряды и частицы живут весь замер (и влезают в снимок)
+
+
+def write_tileset(directory, tile_size=16):
+    """Тайлсет из нескольких залитых тайлов (PNG + TSX)"""
+    image = pygame.Surface((tile_size * TILESET_COLUMNS, tile_size))
+    colors = [(139, 69, 19), (34, 139, 34), (128, 128, 128), (160, 82, 45)]
+    for i, color in enumerate(colors):
+        image.fill(color, (i * tile_size, 0, tile_size, tile_size))
+    pygame.image.save(image, os.path.join(directory, "bench.png"))
+
+    with open(os.path.join(directory, "bench.tsx"), "w", encoding="utf-8") as f:
+        f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<tileset version="1.10" name="bench" tilewidth="{tile_size}" '
+                f'tileheight="{tile_size}" tilecount="{TILESET_COLUMNS}" columns="{TILESET_COLUMNS}">\n'
+                f' <image source="bench.png" width="{tile_size * TILESET_COLUMNS}" '
+                f'height="{tile_size}"/>\n'
+                f'</tileset>\n')
+
+
+def write_map(path, tiles, seed=0, tile_size=16):
+    """Синтетическая карта: сплошной пол и случайные парящие платформы,
+    всего примерно tiles непустых клеток"""
+    rng = random.Random(seed)
+    width = max(50, tiles // (GROUND_ROWS + 4))
+    grid = [[0] * width for _ in range(MAP_HEIGHT)]
+
+    placed = 0
+    for row in range(MAP_HEIGHT - GROUND_ROWS, MAP_HEIGHT):
+        for col in range(width):
+            if placed < tiles:
+                grid[row][col] = 1 + (row == MAP_HEIGHT - GROUND_ROWS)
+                placed += 1
+
+    free_rows = MAP_HEIGHT - GROUND_ROWS - 4  # над полом остаётся место для прыжков
+    attempts = 0
+    while placed < tiles and attempts < tiles * 4:
+        attempts += 1
+        row = rng.randrange(2, free_rows)
+        col = rng.randrange(0, width - 3)
+        for dx in range(3):
+            if grid[row][col + dx] == 0 and placed < tiles:
+                grid[row][col + dx] = 3
+                placed += 1
+
+    directory = os.path.dirname(path)
+    write_tileset(directory, tile_size)
+    rows = ",\n".join(",".join(map(str, line)) for line in grid)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<map version="1.10" orientation="orthogonal" renderorder="right-down" '
+                f'width="{width}" height="{MAP_HEIGHT}" tilewidth="{tile_size}" '
+                f'tileheight="{tile_size}" infinite="0" nextlayerid="3" nextobjectid="2">\n'
+                f' <tileset firstgid="1" source="bench.tsx"/>\n'
+                f' <layer id="1" name="tiles" width="{width}" height="{MAP_HEIGHT}">\n'
+                f'  <data encoding="csv">\n{rows}\n</data>\n'
+                f' </layer>\n'
+                f' <objectgroup id="2" name="objects">\n'
+                f'  <object id="1" name="player" x="{tile_size * 2}" '
+                f'y="{tile_size * (MAP_HEIGHT - GROUND_ROWS - 2)}"/>\n'
+                f' </objectgroup>\n'
+                f'</map>\n')
+    return placed
+
+
+def populate(game, scenario, seed=0):
+    """Добавляет NPC, снаряды и частицы поверх загруженной карты"""
+    from npc import NPC
+    from particle import Particle
+    from projectile import Projectile
+
+    rng = random.Random(seed)
+    ground_y = game.level_height - game.navigation.cell_height * (GROUND_ROWS + 2)
+    behaviors = ("idle", "patrol", "follow")
+    for i in range(scenario.npcs - len(game.npcs)):
+        x = rng.randrange(0, max(1, game.level_width - 200))
+        behavior = behaviors[i % len(behaviors)]
+        patrol = [(x, ground_y), (x + 400, ground_y)] if behavior == "patrol" else None
+        npc = NPC(x, ground_y, NPC_ASSETS_DIR, "Бенчмарк", behavior, patrol)
+        game.npcs.add(npc)
+        game.all_sprites.add(npc)
+
+    player = game.player
+    for _ in range(scenario.projectiles):
+        projectile = Projectile(player.rect.centerx + rng.randrange(-600, 600),
+                                player.rect.centery - rng.randrange(0, 300), rng.random() < 0.5)
+        projectile.lifetime = LONG_LIFETIME
+        player.projectiles.add(projectile)
+    for _ in range(scenario.particles):
+        player.particles.append(Particle(
+            player.rect.centerx + rng.randrange(-300, 300), player.rect.centery,
+            (255, 200, 0), (rng.uniform(-2, 2), rng.uniform(-6, 0)), LONG_LIFETIME))
+    game._apply_quality()
+
+
+def _summary(samples):
+    samples = sorted(samples)
+    return {
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+    }
+
+
+def _sprite_surfaces(game):
+    """Уникальные поверхности, которые рисует сцена: тайлы, кадры, снаряды, частицы"""
+    from render import RenderQueue
+
+    queue = RenderQueue()
+    for player in [game.player] + game.extra_players:
+        player.submit(queue)
+    for npc in game.npcs:
+        npc.submit(queue)
+    images = [command[2] for commands in queue.layers.values() for command in commands]
+
+    images.extend(platform.image for platform in game.platforms)
+    for animation in game.tile_animations.values():
+        images.extend(animation.frames)
+    for sprite in [game.player] + list(game.npcs):
+        for animation in sprite.anim_manager.animations.values():
+            if animation.loaded:
+                images.extend(animation.frames)
+    return list({id(image): image for image in images}.values())
+
+
+def _blit_us(target, images, repeats):
+    """Среднее время одного blit в микросекундах"""
+    width, height = target.get_size()
+    batch = [(image, ((i * 97) % max(1, width - image.get_width()),
+                      (i * 53) % max(1, height - image.get_height())))
+             for i, image in enumerate(images)]
+    started = time.perf_counter()
+    for _ in range(repeats):
+        target.blits(batch, False)
+    return (time.perf_counter() - started) / (repeats * len(batch)) * 1e6
+
+
+def _unprepared(image):
+    """Та же картинка в прежнем виде: попиксельная альфа, без RLE"""
+    copy = pygame.Surface(image.get_size(), pygame.SRCALPHA)
+    copy.blit(image, (0, 0))
+    return copy.convert_alpha()
+
+
+def blit_costs(game, target, repeats=BENCHMARK_BLIT_REPEATS, limit=BENCHMARK_BLIT_SURFACES):
+    """Стоимость blit по классам surfaces: подготовленные поверхности и они же
+    с попиксельной альфой, как рисовались до подготовки"""
+    by_class = {name: [] for name in surfaces.SURFACE_CLASSES}
+    for image in _sprite_surfaces(game):
+        by_class[surfaces.classify(image)].append(image)
+
+    costs = {}
+    for name, images in by_class.items():
+        if not images:
+            continue
+        sample = images[:limit]
+        costs[name] = {
+            "surfaces": len(images),
+            "pixels": round(statistics.fmean(w * h for w, h in (i.get_size() for i in sample))),
+            "blit_us": round(_blit_us(target, sample, repeats), 3),
+            "unprepared_us": round(_blit_us(target, [_unprepared(i) for i in sample], repeats), 3),
+        }
+    return costs
+
+
+def run_scenario(name, scenario, frames=BENCHMARK_FRAMES, warmup=BENCHMARK_WARMUP):
+    from game import Game
+    from controls import NO_INPUT
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as directory:
+        map_path = os.path.join(directory, "bench.tmx")
+        tiles = write_map(map_path, scenario.tiles)
+
+        random.seed(0)
+        game = Game(map_path=os.path.join(directory, "missing.tmx"))  # дешёвый демо-уровень
+        started = time.perf_counter()
+        game.load_tmx_map(map_path)
+        load_s = time.perf_counter() - started
+        game.map_watcher = None
+
+    game.player.controls = NO_INPUT
+    populate(game, scenario)
+
+    surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    clock = pygame.time.Clock()
+    update_times = []
+    draw_times = []
+    for frame in range(warmup + frames):
+        started = time.perf_counter()
+        game.update()
+        updated = time.perf_counter()
+        game.draw(surface, clock)
+        drawn = time.perf_counter()
+        if frame >= warmup:
+            update_times.append(updated - started)
+            draw_times.append(drawn - updated)
+
+    return {
+        "scenario": name,
+        "tiles": tiles,
+        "npcs": len(game.npcs),
+        "projectiles": scenario.projectiles,
+        "particles": scenario.particles,
+        "frames": frames,
+        "load_ms": round(load_s * 1000, 3),
+        "update": _summary(update_times),
+        "draw": _summary(draw_times),
+        "blit": blit_costs(game, surface),
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metrics(result):
+    return {
+        "load_ms": result["load_ms"],
+        "update_mean_ms": result["update"]["mean_ms"],
+        "draw_mean_ms": result["draw"]["mean_ms"],
+    }
+
+
+def _machine():
+    """Сравнивать можно только прогоны с одной машины"""
+    return f"{socket.gethostname()}/{os.cpu_count()}"
+
+
+def load_history(path=BENCHMARK_RESULTS_PATH, machine=None):
+    """Прошлые прогоны этой машины из журнала результатов (от старых к новым)"""
+    machine = machine or _machine()
+    if not os.path.exists(path):
+        return []
+    history = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("machine") == machine:
+                history.append(record)
+    return history
+
+
+def baseline(history, runs=BENCHMARK_BASELINE_RUNS):
+    """База по последним runs прогонам: сценарий -> метрика -> (медиана, разброс MAD, прогонов)"""
+    values = {}
+    for record in history:
+        for result in record.get("results", []):
+            for metric, value in _metrics(result).items():
+                values.setdefault(result["scenario"], {}).setdefault(metric, []).append(value)
+
+    base = {}
+    for scenario, metrics in values.items():
+        for metric, samples in metrics.items():
+            samples = samples[-runs:]
+            median = statistics.median(samples)
+            spread = statistics.median(abs(value - median) for value in samples)
+            base.setdefault(scenario, {})[metric] = (median, spread, len(samples))
+    return base
+
+
+def check_regressions(results, base, min_runs=BENCHMARK_BASELINE_MIN_RUNS,
+                      ratio=BENCHMARK_REGRESSION_RATIO, sigmas=BENCHMARK_NOISE_SIGMAS):
+    """Список регрессий: (сценарий, метрика, значение, порог).
+    Порог - медиана базы плюс доля ratio и sigmas разбросов прошлых прогонов"""
+    failures = []
+    for result in results:
+        metrics = base.get(result["scenario"], {})
+        for metric, value in _metrics(result).items():
+            if metric not in metrics:
+                continue
+            median, spread, runs = metrics[metric]
+            if runs < min_runs:
+                continue  # на одном-двух прогонах шум не отличить от регрессии
+            limit = median * (1 + ratio) + sigmas * spread
+            if value > limit:
+                failures.append((result["scenario"], metric, value, limit))
+    return failures
+
+
+def format_results(results):
+    lines = [f"{'сценарий':<16} {'тайлов':>8} {'NPC':>6} {'загрузка':>10} "
+             f"{'update':>9} {'p95':>8} {'draw':>9} {'p95':>8}"]
+    for r in results:
+        lines.append(f"{r['scenario']:<16} {r['tiles']:>8} {r['npcs']:>6} {r['load_ms']:>8.1f}мс "
+                     f"{r['update']['mean_ms']:>7.2f}мс {r['update']['p95_ms']:>6.2f}мс "
+                     f"{r['draw']['mean_ms']:>7.2f}мс {r['draw']['p95_ms']:>6.2f}мс")
+
+    lines.append("")
+    lines.append(f"{'сценарий':<16} {'класс':<9} {'поверхн.':>8} {'пикселей':>9} "
+                 f"{'blit':>9} {'без подг.':>10}")
+    for r in results:
+        for name, cost in r.get("blit", {}).items():
+            lines.append(f"{r['scenario']:<16} {name:<9} {cost['surfaces']:>8} {cost['pixels']:>9} "
+                         f"{cost['blit_us']:>7.2f}мкс {cost['unprepared_us']:>8.2f}мкс")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Запуск без окна:
+    python benchmark.py                     - сценарии по умолчанию
+    python benchmark.py tiles_100k npcs_1k  - выбранные сценарии
+    Результат сравнивается с прошлыми прогонами на этой же машине (benchmark_results.jsonl).
+    Код возврата 1 - какая-то метрика заметно хуже базы"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    args = list(sys.argv[1:] if argv is None else argv)
+    names = [arg for arg in args if not arg.startswith("--")] or list(DEFAULT_SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"Неизвестные сценарии: {', '.join(unknown)}. Доступны: {', '.join(SCENARIOS)}")
+        return 2
+
+    from startup import init_pygame
+    init_pygame()
+    pygame.display.set_mode((1, 1))  # нужен для convert_alpha
+
+    results = []
+    for name in names:
+        print(f"Сценарий {name}...")
+        results.append(run_scenario(name, SCENARIOS[name]))
+    print(format_results(results))
+
+    machine = _machine()
+    base = baseline(load_history(BENCHMARK_RESULTS_PATH, machine))
+    record = {
+        "timestamp": time.time(),
+        "commit": _commit(),
+        "machine": machine,
+        "python": sys.version.split()[0],
+        "pygame": pygame.version.ver,
+        "video_driver": os.environ.get("SDL_VIDEODRIVER"),
+        "results": results,
+    }
+    with open(BENCHMARK_RESULTS_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print(f"Результаты дописаны в {BENCHMARK_RESULTS_PATH}")
+
+    runs = min((runs for metrics in (base.get(name, {}) for name in names)
+                for _, _, runs in metrics.values()), default=0)
+    if runs < BENCHMARK_BASELINE_MIN_RUNS:
+        print(f"База этой машины: {runs} прогонов из {BENCHMARK_BASELINE_MIN_RUNS} нужных - "
+              f"регрессии пока не проверяются")
+
+    failures = check_regressions(results, base)
+    for scenario, metric, value, limit in failures:
+        print(f"РЕГРЕССИЯ {scenario}: {metric} = {value:.2f} мс > порога {limit:.2f} мс")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+import socket
+import sys
+from collections import OrderedDict
+import pygame
+from settings import (SCREEN_WIDTH, SCREEN_HEIGHT, FPS, NET_HOST, NET_PORT, NET_TICK_RATE,
+                      NET_HISTORY, NET_INTERP_DELAY)
+from controls import read_keyboard, pack_input
+from net import (MSG_INPUT, MSG_BYE, INPUT, KIND_PLAYER, KIND_NPC, KIND_PROJECTILE,
+                 NPC_DIALOG_ACTIVE, NPC_DIALOG_SHOWN, NPC_DIALOG_FINISHED,
+                 PLAYER_STATES, animation_names, dequantize, decode_snapshot, interpolate)
+from projectile import Projectile
+
+
+def _show_frame(sprite, name, frame):
+    """Показывает заданный кадр анимации без участия часов"""
+    animation = sprite.anim_manager.animations.get(name)
+    if animation is None or not animation.frames:
+        return
+    sprite.image = animation.frames[min(frame, len(animation.frames) - 1)]
+
+
+class Client:
+    """Отправляет кнопки на сервер и рисует полученные снимки с интерполяцией"""
+
+    def __init__(self, game, host=NET_HOST, port=NET_PORT):
+        self.game = game
+        self.server = (host, port)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.states = OrderedDict()  # тик -> мир, по возрастанию тиков
+        self.latest_tick = 0
+        self.you = None
+        self.render_tick = 0.0
+        self.players = {}  # net_id -> Player (копии чужих игроков)
+        self.projectiles = {}  # net_id -> Projectile
+        self.npc_animations = [animation_names(npc.anim_manager) for npc in game.npcs]
+        self.bytes_received = 0
+
+    def receive(self):
+        while True:
+            try:
+                data, _ = self.socket.recvfrom(65536)
+            except (BlockingIOError, ConnectionResetError):
+                return
+            self.bytes_received += len(data)
+            decoded = decode_snapshot(data, self.states)
+            if decoded is None:
+                continue
+            tick, you, world = decoded
+            if tick <= self.latest_tick:
+                continue  # опоздавший пакет
+            self.you = you
+            self.states[tick] = world
+            self.latest_tick = tick
+            while len(self.states) > NET_HISTORY:
+                self.states.popitem(last=False)
+
+    def send_input(self, controls):
+        packet = INPUT.pack(MSG_INPUT, self.latest_tick, pack_input(controls))
+        try:
+            self.socket.sendto(packet, self.server)
+        except OSError:
+            pass
+
+    def close(self):
+        try:
+            self.socket.sendto(bytes((MSG_BYE,)), self.server)
+        except OSError:
+            pass
+        self.socket.close()
+
+    def advance(self, dt):
+        """Сдвигает время отрисовки; держится на NET_INTERP_DELAY тиков позади сервера"""
+        if not self.states:
+            return None
+        self.render_tick += dt * NET_TICK_RATE
+        target = self.latest_tick - NET_INTERP_DELAY
+        if abs(self.render_tick - target) > NET_INTERP_DELAY * 2:
+            self.render_tick = target  # слишком отстали или убежали - перескакиваем
+        self.render_tick = min(self.render_tick, self.latest_tick)
+        return self._world_at(self.render_tick)
+
+    def _world_at(self, render_tick):
+        older = newer = None
+        for tick, world in self.states.items():
+            if tick <= render_tick:
+                older = (tick, world)
+            else:
+                newer = (tick, world)
+                break
+        if older is None:
+            return newer[1]
+        if newer is None:
+            return older[1]
+        t = (render_tick - older[0]) / (newer[0] - older[0])
+        return interpolate(older[1], newer[1], t)
+
+    def apply(self, world):
+        """Переносит мир из снимка на спрайты клиентской копии уровня"""
+        game = self.game
+        npcs = list(game.npcs)
+        seen_players = set()
+        seen_projectiles = set()
+
+        for net_id, (kind, fields) in world.items():
+            x, y = int(dequantize(fields[0])), int(dequantize(fields[1]))
+            if kind == KIND_PLAYER:
+                player = game.player if net_id == self.you else self._player(net_id)
+                seen_players.add(net_id)
+                player.rect.topleft = (x, y)
+                player.facing_right = bool(fields[2])
+                player.state = PLAYER_STATES[fields[3]]
+                _show_frame(player, player.state, fields[4])
+            elif kind == KIND_NPC and fields[2] < len(npcs):
+                npc = npcs[fields[2]]
+                npc.rect.topleft = (x, y)
+                names = self.npc_animations[fields[2]]
+                if names:
+                    _show_frame(npc, names[fields[3]], fields[4])
+                self._apply_dialog(npc, fields[5], fields[6])
+            elif kind == KIND_PROJECTILE:
+                projectile = self.projectiles.get(net_id)
+                if projectile is None:
+                    projectile = self.projectiles[net_id] = Projectile(0, 0, True)
+                projectile.rect.topleft = (x, y)
+                seen_projectiles.add(net_id)
+
+        for net_id in [i for i in self.players if i not in seen_players]:
+            game.remove_player(self.players.pop(net_id))
+        for net_id in [i for i in self.projectiles if i not in seen_projectiles]:
+            del self.projectiles[net_id]
+        # Снаряды всех игроков рисуются через группу своего игрока
+        game.player.projectiles.empty()
+        game.player.projectiles.add(*self.projectiles.values())
+
+    def _player(self, net_id):
+        player = self.players.get(net_id)
+        if player is None:
+            player = self.players[net_id] = self.game.add_player()
+        return player
+
+    @staticmethod
+    def _apply_dialog(npc, text_index, flags):
+        npc.dialog_active = bool(flags & NPC_DIALOG_ACTIVE)
+        npc.dialog_shown = bool(flags & NPC_DIALOG_SHOWN)
+        npc.dialog_finished = bool(flags & NPC_DIALOG_FINISHED)
+        if text_index != npc.text_index:
+            npc.text_index = text_index
+            npc.current_text = npc.dialog_text[:text_index]
+            if npc.dialog_active and text_index > 0:
+                npc._render_cloud()
+            else:
+                npc.cloud_surface = None
+
+
+def main():
+    """Клиент: python client.py [хост] [порт]"""
+    from startup import init_pygame
+    from game import Game
+
+    host = sys.argv[1] if len(sys.argv) > 1 else NET_HOST
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else NET_PORT
+
+    init_pygame()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Pygame Platformer (клиент)")
+    clock = pygame.time.Clock()
+    game = Game()
+    client = Client(game, host, port)
+
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                running = False
+
+        client.receive()
+        client.send_input(read_keyboard())
+        world = client.advance(clock.get_time() / 1000)
+        if world is not None:
+            client.apply(world)
+            game.follow_camera(game.player.rect)
+        game.draw(screen, clock)
+        pygame.display.flip()
+        clock.tick(FPS)
+
+    client.close()
+    pygame.quit()
+    sys.exit()
+
+
+if __name__ == "__main__":
+    main()
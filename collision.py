@@ -0,0 +1,224 @@
+import pygame
+from settings import LEVEL_BUILD_CHUNK, LEVEL_MASK_STRIPE_WIDTH
+
+
+class LevelMask:
+    """Маска коллизий всего уровня, собранная из масок тайлов.
+    Маска покрывает все тайлы, даже выходящие за заявленные размеры уровня.
+    Хранится вертикальными полосами: огромную маску не приходится выделять
+    (и обнулять) одним куском"""
+
+    def __init__(self, width, height, origin=(0, 0), stripe_width=LEVEL_MASK_STRIPE_WIDTH,
+                 allocate=True):
+        self.rect = pygame.Rect(origin, (max(1, width), max(1, height)))  # покрытая область уровня
+        self.stripe_width = max(1, stripe_width)
+        self.stripes = []
+        if allocate:
+            for _ in self.allocate_steps():
+                pass
+
+    def allocate_steps(self):
+        """Выделяет полосы по одной, уступая управление после каждой"""
+        while len(self.stripes) * self.stripe_width < self.rect.width:
+            left = len(self.stripes) * self.stripe_width
+            width = min(self.stripe_width, self.rect.width - left)
+            self.stripes.append(pygame.mask.Mask((width, self.rect.height)))
+            yield
+
+    @classmethod
+    def from_platforms(cls, platforms, width, height):
+        return run_steps(cls.build_steps(platforms, width, height))
+
+    @classmethod
+    def build_steps(cls, platforms, width, height, chunk=LEVEL_BUILD_CHUNK):
+        """Сборка по частям: генератор уступает управление после каждой полосы
+        и каждые chunk тайлов, маска - значение StopIteration"""
+        bounds = pygame.Rect(0, 0, width, height)
+        rects = [platform.rect for platform in platforms]
+        if rects:
+            bounds.union_ip(rects[0].unionall(rects))
+        level_mask = cls(bounds.width, bounds.height, bounds.topleft, allocate=False)
+        yield from level_mask.allocate_steps()
+        for index, platform in enumerate(platforms, 1):
+            level_mask.add(platform)
+            if index % chunk == 0:
+                yield
+        return level_mask
+
+    @staticmethod
+    def _platform_mask(platform):
+        mask = getattr(platform, 'mask', None)
+        if mask is None:
+            mask = pygame.mask.from_surface(platform.image)
+        return mask
+
+    def _offset(self, x, y):
+        return int(x) - self.rect.x, int(y) - self.rect.y
+
+    def _touched(self, x, width):
+        """Полосы, которые задевает отрезок [x, x + width) в координатах маски:
+        (номер полосы, левый край полосы)"""
+        first = max(0, x // self.stripe_width)
+        last = min(len(self.stripes) - 1, (x + width - 1) // self.stripe_width)
+        for index in range(first, last + 1):
+            yield index, index * self.stripe_width
+
+    def _grow(self, rect):
+        """Расширяет маску, чтобы тайл за её краем не обрезался"""
+        bounds = self.rect.union(rect)
+        grown = LevelMask(bounds.width, bounds.height, bounds.topleft, self.stripe_width)
+        for index, stripe in enumerate(self.stripes):
+            grown._draw(stripe, self.rect.x + index * self.stripe_width, self.rect.y)
+        self.rect = grown.rect
+        self.stripes = grown.stripes
+
+    def _draw(self, mask, x, y, erase=False):
+        x, y = self._offset(x, y)
+        for index, left in self._touched(x, mask.get_size()[0]):
+            stripe = self.stripes[index]
+            if erase:
+                stripe.erase(mask, (x - left, y))
+            else:
+                stripe.draw(mask, (x - left, y))
+
+    def add(self, platform):
+        """Добавляет тайл в маску уровня"""
+        if not self.rect.contains(platform.rect):
+            self._grow(platform.rect)
+        self._draw(self._platform_mask(platform), *platform.rect.topleft)
+
+    def remove(self, platform, platforms):
+        """Убирает тайл и перерисовывает соседей в его области"""
+        self._draw(self._platform_mask(platform), *platform.rect.topleft, erase=True)
+        self.refresh_region(platform.rect, platforms, exclude=platform)
+
+    def refresh_region(self, region, platforms, exclude=None):
+        """Перерисовывает только тайлы, пересекающие region"""
+        for other in platforms:
+            if other is not exclude and other.rect.colliderect(region):
+                self.add(other)
+
+    def overlap(self, entity_mask, x, y):
+        """Первая точка пересечения маски сущности с уровнем (в координатах маски) или None"""
+        x, y = self._offset(x, y)
+        for index, left in self._touched(x, entity_mask.get_size()[0]):
+            hit = self.stripes[index].overlap(entity_mask, (x - left, y))
+            if hit:
+                return hit[0] + left, hit[1]
+        return None
+
+
+def run_steps(steps):
+    """Выполняет пошаговую сборку целиком и возвращает её результат"""
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
+
+
+def split_subpixel(distance, remainder):
+    """Делит смещение на целые пиксели и дробный остаток на следующий кадр"""
+    total = distance + remainder
+    step = int(total)
+    return step, total - step
+
+
+def swept_aabb(moving, dx, dy, target):
+    """Время первого касания (0..1) прямоугольника moving, движущегося на (dx, dy),
+    с неподвижным target и нормаль удара. None - касания на этом шаге нет"""
+    if dx > 0:
+        x_entry, x_exit = target.left - moving.right, target.right - moving.left
+    else:
+        x_entry, x_exit = target.right - moving.left, target.left - moving.right
+    if dy > 0:
+        y_entry, y_exit = target.top - moving.bottom, target.bottom - moving.top
+    else:
+        y_entry, y_exit = target.bottom - moving.top, target.top - moving.bottom
+
+    if dx == 0:
+        # Без движения по оси нужны перекрывающиеся проекции
+        if moving.right <= target.left or moving.left >= target.right:
+            return None
+        tx_entry, tx_exit = float('-inf'), float('inf')
+    else:
+        tx_entry, tx_exit = x_entry / dx, x_exit / dx
+    if dy == 0:
+        if moving.bottom <= target.top or moving.top >= target.bottom:
+            return None
+        ty_entry, ty_exit = float('-inf'), float('inf')
+    else:
+        ty_entry, ty_exit = y_entry / dy, y_exit / dy
+
+    entry = max(tx_entry, ty_entry)
+    exit_time = min(tx_exit, ty_exit)
+    # entry < 0: уже пересекаемся - это дело обычной проверки перекрытия
+    if entry > exit_time or entry < 0 or entry > 1:
+        return None
+
+    if tx_entry > ty_entry:
+        normal = (-1 if dx > 0 else 1, 0)
+    else:
+        normal = (0, -1 if dy > 0 else 1)
+    return entry, normal
+
+
+class SpatialGrid:
+    """Пространственная сетка платформ: быстрый поиск соседей для swept AABB"""
+
+    def __init__(self, cell_size):
+        self.cell_size = max(1, int(cell_size))
+        self.cells = {}
+
+    @classmethod
+    def from_platforms(cls, platforms, cell_size):
+        return run_steps(cls.build_steps(platforms, cell_size))
+
+    @classmethod
+    def build_steps(cls, platforms, cell_size, chunk=LEVEL_BUILD_CHUNK):
+        """Сборка по частям, как LevelMask.build_steps"""
+        grid = cls(cell_size)
+        for index, platform in enumerate(platforms, 1):
+            grid.add(platform)
+            if index % chunk == 0:
+                yield
+        return grid
+
+    def _cell_range(self, rect):
+        size = self.cell_size
+        return (range(rect.left // size, (rect.right - 1) // size + 1),
+                range(rect.top // size, (rect.bottom - 1) // size + 1))
+
+    def add(self, platform):
+        cols, rows = self._cell_range(platform.rect)
+        for col in cols:
+            for row in rows:
+                self.cells.setdefault((col, row), []).append(platform)
+
+    def remove(self, platform):
+        cols, rows = self._cell_range(platform.rect)
+        for col in cols:
+            for row in rows:
+                bucket = self.cells.get((col, row))
+                if bucket and platform in bucket:
+                    bucket.remove(platform)
+
+    def query(self, rect):
+        """Платформы в ячейках, которые задевает rect (без повторов)"""
+        found = {}
+        cols, rows = self._cell_range(rect)
+        for col in cols:
+            for row in rows:
+                for platform in self.cells.get((col, row), ()):
+                    found[id(platform)] = platform
+        return found.values()
+
+    def sweep(self, rect, dx, dy):
+        """Самое раннее касание при движении rect на (dx, dy): (время, нормаль, платформа)"""
+        area = rect.union(rect.move(dx, dy))
+        best = None
+        for platform in self.query(area):
+            hit = swept_aabb(rect, dx, dy, platform.rect)
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = (hit[0], hit[1], platform)
+        return best
@@ -0,0 +1,32 @@
+from collections import namedtuple
+import pygame
+
+# Состояние кнопок игрока: с клавиатуры или по сети от клиента
+PlayerInput = namedtuple("PlayerInput", ["left", "right", "jump", "attack", "interact"],
+                         defaults=(False, False, False, False, False))
+
+NO_INPUT = PlayerInput()
+
+
+def read_keyboard():
+    keys = pygame.key.get_pressed()
+    return PlayerInput(
+        left=keys[pygame.K_a] or keys[pygame.K_LEFT],
+        right=keys[pygame.K_d] or keys[pygame.K_RIGHT],
+        jump=keys[pygame.K_SPACE] or keys[pygame.K_w] or keys[pygame.K_UP],
+        attack=keys[pygame.K_j] or keys[pygame.K_z] or keys[pygame.K_LCTRL],
+        interact=keys[pygame.K_SPACE] or keys[pygame.K_e] or keys[pygame.K_RETURN],
+    )
+
+
+def pack_input(controls):
+    """Кнопки в один байт (бит на кнопку)"""
+    bits = 0
+    for i, pressed in enumerate(controls):
+        if pressed:
+            bits |= 1 << i
+    return bits
+
+
+def unpack_input(bits):
+    return PlayerInput(*(bool(bits & (1 << i)) for i in range(len(PlayerInput._fields))))
@@ -1,27 +1,66 @@
+import math
 import pygame
-import pytmx
 import os
 from settings import (SCREEN_WIDTH, SCREEN_HEIGHT, WHITE, DEFAULT_MAP,
-                      PLAYER_ASSETS_DIR, MAPS_DIR, TILE_SCALE, CAMERA_SMOOTH,
-                      NPC_ASSETS_DIR, TILE_SIZE, ORIGINAL_TILE_SIZE)
+                      PLAYER_ASSETS_DIR, MAPS_DIR, CAMERA_SMOOTH,
+                      NPC_ASSETS_DIR, TILE_SIZE, ORIGINAL_TILE_SIZE,
+                      WORLD_SCALE, WORLD_UNIT, PRESENT_SCALE, VIEW_WIDTH, VIEW_HEIGHT,
+                      COLLISION_GRID_CELL_TILES, HOT_RELOAD, LEVEL_BUILD_CHUNK,
+                      LEVEL_PREBUILD_DISTANCE)
 from player import Player
 from platform import Platform
 from npc import NPC
+from navigation import NavGraph, PathScheduler
+from collision import LevelMask, SpatialGrid
+from animation import shared_clock, TileAnimation
+import asset_loader
+import surfaces
+from startup import init_pygame
+from snapshot import SnapshotHistory
+from quality import QualityGovernor
+from render import RenderQueue, LAYER_BACKGROUND, LAYER_TILES
+from hot_reload import MapWatcher
+from levels import LevelManager
 
 
 class Game:
     def __init__(self, player_assets_path=None, map_path=None):
+        init_pygame()
         self.player_assets_path = player_assets_path or PLAYER_ASSETS_DIR
         self.map_path = map_path or DEFAULT_MAP
         self.all_sprites = pygame.sprite.Group()
         self.platforms = pygame.sprite.Group()
         self.npcs = pygame.sprite.Group()
         self.player = None
+        self.extra_players = []  # игроки сетевых клиентов (на сервере) или их копии (на клиенте)
+        self.spawn_point = (0, 0)
         self.camera_x = 0
         self.camera_y = 0
         self.level_width = 0
         self.level_height = 0
-        self.tile_scale = TILE_SCALE
+        self.tile_scale = WORLD_SCALE
+        # Поверхность мира в родном разрешении (None - рисуем сразу на экран)
+        self.world_surface = None
+        if PRESENT_SCALE != 1:
+            self.world_surface = pygame.Surface((VIEW_WIDTH, VIEW_HEIGHT))
+        self.navigation = None
+        self.path_scheduler = None
+        self.level_mask = None
+        self.collision_grid = None
+        self.history = None
+        self.quality = QualityGovernor()
+        self._sky = None  # закэшированный градиент неба
+        self._cloud = None
+        self.render_queue = RenderQueue()
+        # Раскладка тайлов TMX для горячей перезагрузки: (слой, x, y) -> (тайл, платформа);
+        # тайл - (GID из Tiled, флаги отражения)
+        self.tile_layout = {}
+        self.tile_hashes = {}  # тайл -> хэш пикселей исходного тайла
+        self.tile_animations = {}  # тайл -> TileAnimation, общий на все экземпляры тайла
+        self.map_watcher = None
+        self.exits = []  # (прямоугольник, путь к карте) - переходы на другие уровни
+        self.touched_exits = set()  # выходы, в которых игрок стоит сейчас
+        self.levels = LevelManager(self)
 
         self._load_map()
 
@@ -41,13 +80,19 @@ class Game:
         self.platforms.empty()
         self.all_sprites.empty()
         self.npcs.empty()
+        self.tile_layout = {}
+        self.tile_hashes = {}
+        self.tile_animations = {}
+        self.map_watcher = None
+        self.exits = []
+        self.touched_exits = set()
 
         # ИСПРАВЛЕНО: используем TILE_SIZE (128) вместо ручного расчёта
         tile_size = TILE_SIZE
 
-        # Пол (высота 600)
-        ground_y = 600
-        for i in range(0, 2000, tile_size):
+        # Пол (высота 600 экранных пикселей)
+        ground_y = int(600 * WORLD_UNIT)
+        for i in range(0, int(2000 * WORLD_UNIT), tile_size):
             platform = Platform(i, ground_y, tile_size, tile_size, 'ground')
             self.platforms.add(platform)
             self.all_sprites.add(platform)
@@ -68,27 +113,65 @@ class Game:
             self.platforms.add(platform)
             self.all_sprites.add(platform)
 
+        # Процедурные тайлы непрозрачны: переводим в формат дисплея без альфы
+        for platform in self.platforms:
+            platform.set_image(surfaces.prepare(platform.image))
+
         # Игрок
-        self.player = Player(100, 400, self.player_assets_path)
+        self.player = Player(int(100 * WORLD_UNIT), int(400 * WORLD_UNIT), self.player_assets_path)
         self.all_sprites.add(self.player)
+        self.spawn_point = self.player.rect.topleft
+        self.extra_players = []
 
         # NPC в середине карты, падает сверху на пол
-        npc_x = 1000
-        npc_y = 100  # высоко над землёй, будет падать
+        npc_x = int(1000 * WORLD_UNIT)
+        npc_y = int(100 * WORLD_UNIT)  # высоко над землёй, будет падать
 
+        # Патрулирует пол между двумя каменными платформами
+        patrol_points = [(int(800 * WORLD_UNIT), ground_y), (int(1200 * WORLD_UNIT), ground_y)]
         npc = NPC(npc_x, npc_y, NPC_ASSETS_DIR,
                   "Добро пожаловать в этот мир! Я уже много лет исследую эти земли. "
                   "На востоке есть древние руины, но путь туда опасен. "
-                  "Берегись летучих мышей в пещерах!")
+                  "Берегись летучих мышей в пещерах!",
+                  behavior="patrol", patrol_points=patrol_points)
         self.npcs.add(npc)
         self.all_sprites.add(npc)
 
-        self.level_width = int(2000 * self.tile_scale / 8)
-        self.level_height = 720
+        # Ширина по последнему тайлу пола: он выходит за 2000 экранных пикселей
+        self.level_width = max(platform.rect.right for platform in self.platforms)
+        self.level_height = int(720 * WORLD_UNIT)
+
+        self._build_level_mask()
+        self._build_navigation(tile_size, tile_size)
+        self._apply_quality()
+        self.history = SnapshotHistory(self)
 
     def load_tmx_map(self, filepath):
         """Загрузка карты из Tiled с NPC в середине"""
-        tmx_data = pytmx.load_pygame(filepath)
+        for _ in self.build_tmx_map(filepath):
+            pass
+
+    def build_tmx_map(self, filepath, background=False):
+        """Загрузка карты по шагам: генератор отдаёт управление между частями работы.
+        background=True - не ждать потоки загрузчика, а уступать кадр
+        (такой шаг отдаёт список задач, которых ждёт); историю снимков тогда
+        создаёт LevelManager.switch"""
+        import pytmx  # ленивый импорт: нужен только при загрузке TMX
+
+        if background:
+            # XML разбирается в потоке загрузчика; картинки тайлсетов (convert) -
+            # в главном потоке, как в pytmx.load_pygame
+            from pytmx.util_pygame import pygame_image_loader
+            parsed = asset_loader.run_async(self._parse_tmx, filepath)
+            while not parsed.done():
+                yield [parsed]
+            tmx_data, layout = parsed.result()
+            tmx_data.image_loader = pygame_image_loader
+            tmx_data.reload_images()
+        else:
+            tmx_data = pytmx.load_pygame(filepath)
+            layout = self._read_layout(tmx_data)
+        yield
 
         original_tile_width = tmx_data.tilewidth  # Должно быть 16
         original_tile_height = tmx_data.tileheight  # Должно быть 16
@@ -103,25 +186,42 @@ class Game:
         self.all_sprites.empty()
         self.npcs.empty()
 
-        for layer in tmx_data.visible_layers:
-            if isinstance(layer, pytmx.TiledTileLayer):
-                for x, y, gid in layer:
-                    tile = tmx_data.get_tile_image_by_gid(gid)
-                    if tile:
-                        if self.tile_scale != 1.0:
-                            new_width = int(tile.get_width() * self.tile_scale)
-                            new_height = int(tile.get_height() * self.tile_scale)
-                            tile = pygame.transform.scale(tile, (new_width, new_height))
-
-                        platform = Platform(
-                            x * scaled_tile_width,
-                            y * scaled_tile_height,
-                            scaled_tile_width,
-                            scaled_tile_height
-                        )
-                        platform.set_image(tile)
-                        self.platforms.add(platform)
-                        self.all_sprites.add(platform)
+        # Каждый уникальный тайл масштабируется один раз, параллельно в пуле потоков;
+        # все экземпляры тайла делят одну поверхность
+        scaled_tiles = self._scale_tiles_async(tmx_data, set(layout.values()))
+        pending = [future for future in scaled_tiles.values() if future]
+        while background and not asset_loader.wait_all(pending, timeout=0):
+            yield pending
+        tile_images = self._prepare_tiles(scaled_tiles)
+        tile_masks = self._tile_masks(tile_images)
+        self.tile_animations = {}
+        self._load_tile_animations(tmx_data, set(layout.values()))
+
+        self.tile_layout = {}
+        for index, (key, tile) in enumerate(layout.items(), 1):
+            image = tile_images.get(tile)
+            if image:
+                platform = self._create_tile(key, image, scaled_tile_width, scaled_tile_height,
+                                             self.tile_animations.get(tile), tile_masks[tile])
+                self.platforms.add(platform)
+                self.all_sprites.add(platform)
+                self.tile_layout[key] = (tile, platform)
+            if index % LEVEL_BUILD_CHUNK == 0:
+                yield
+        self.tile_hashes = self._hash_tiles(tmx_data, layout.values())
+
+        # Переходы на другие карты: объекты "exit" со свойством map (путь от папки карты)
+        self.exits = []
+        self.touched_exits = set()
+        for obj_layer in tmx_data.objectgroups:
+            for obj in obj_layer:
+                target = obj.properties.get('map') if obj.name == 'exit' else None
+                if target:
+                    rect = pygame.Rect(int(obj.x * self.tile_scale), int(obj.y * self.tile_scale),
+                                       max(1, int((obj.width or 0) * self.tile_scale)),
+                                       max(1, int((obj.height or 0) * self.tile_scale)))
+                    path = os.path.normpath(os.path.join(os.path.dirname(filepath), target))
+                    self.exits.append((rect, path))
 
         player_spawned = False
         for obj_layer in tmx_data.objectgroups:
@@ -135,90 +235,465 @@ class Game:
                     player_spawned = True
 
         if not player_spawned:
-            self.player = Player(100, 100, self.player_assets_path)
+            self.player = Player(int(100 * WORLD_UNIT), int(100 * WORLD_UNIT), self.player_assets_path)
             self.all_sprites.add(self.player)
+        self.spawn_point = self.player.rect.topleft
+        self.extra_players = []
 
-        # NPC в середине карты, стоящий на земле
-        # Находим нижнюю точку карты (где есть платформы)
-        lowest_platform_y = self.level_height
-        for platform in self.platforms:
-            if platform.rect.bottom > lowest_platform_y:
-                lowest_platform_y = platform.rect.bottom
+        # NPC из объектов "npc" карты
+        for obj_layer in tmx_data.objectgroups:
+            for obj in obj_layer:
+                if obj.name == 'npc':
+                    npc = self._npc_from_object(obj)
+                    self.npcs.add(npc)
+                    self.all_sprites.add(npc)
+
+        if not self.npcs:
+            # NPC в середине карты, стоящий на земле
+            # Находим нижнюю точку карты (где есть платформы)
+            lowest_platform_y = self.level_height
+            for platform in self.platforms:
+                if platform.rect.bottom > lowest_platform_y:
+                    lowest_platform_y = platform.rect.bottom
+
+            npc_x = self.level_width // 2
+            npc_sprite_height = TILE_SIZE  # 128
+            npc_y = lowest_platform_y - npc_sprite_height
+
+            npc = NPC(npc_x, npc_y, NPC_ASSETS_DIR,
+                      "Приветствую тебя в этом загадочном мире! "
+                      "Я старейшина этих мест. Давным-давно здесь процветала великая цивилизация, "
+                      "но теперь остались лишь руины и воспоминания. "
+                      "Ищи артефакты древних — они помогут тебе в пути!")
+            self.npcs.add(npc)
+            self.all_sprites.add(npc)
+
+        yield from self._build_level_mask_steps()
+        yield from self._build_navigation_steps(scaled_tile_width, scaled_tile_height)
+        self._apply_quality()
+        if not background:
+            # Снимок пересеивает глобальный ГСЧ, а фоновая сборка идёт посреди симуляции
+            # активного уровня: её история создаётся при переключении (LevelManager.switch)
+            self.history = SnapshotHistory(self)
+
+        self.map_path = filepath
+        self.map_watcher = MapWatcher(filepath) if HOT_RELOAD else None
 
-        npc_x = self.level_width // 2
-        npc_sprite_height = TILE_SIZE  # 128
-        npc_y = lowest_platform_y - npc_sprite_height
+        print(f"Карта загружена: {self.level_width}x{self.level_height} (масштаб {self.tile_scale}x)")
 
-        npc = NPC(npc_x, npc_y, NPC_ASSETS_DIR,
-                  "Приветствую тебя в этом загадочном мире! "
-                  "Я старейшина этих мест. Давным-давно здесь процветала великая цивилизация, "
-                  "но теперь остались лишь руины и воспоминания. "
-                  "Ищи артефакты древних — они помогут тебе в пути!")
-        self.npcs.add(npc)
-        self.all_sprites.add(npc)
+    def _npc_from_object(self, obj):
+        """NPC из объекта карты. Свойства: behavior (idle, patrol, follow) и dialog;
+        патрульный ходит по низу объекта от левого края до правого"""
+        left = int(obj.x * self.tile_scale)
+        top = int(obj.y * self.tile_scale)
+        right = left + int((obj.width or 0) * self.tile_scale)
+        bottom = top + int((obj.height or 0) * self.tile_scale)
+        behavior = obj.properties.get('behavior', 'idle')
+        patrol_points = [(left, bottom), (right, bottom)] if behavior == 'patrol' else None
+        return NPC(left, top, NPC_ASSETS_DIR, obj.properties.get('dialog'),
+                   behavior, patrol_points)
+
+    @classmethod
+    def _parse_tmx(cls, filepath):
+        """Разбор XML и раскладка тайлов без картинок - можно в потоке загрузчика"""
+        import pytmx
+        tmx_data = pytmx.TiledMap(filepath)
+        return tmx_data, cls._read_layout(tmx_data)
+
+    @staticmethod
+    def _tile_layers(tmx_data):
+        import pytmx
+        return [layer for layer in tmx_data.visible_layers
+                if isinstance(layer, pytmx.TiledTileLayer)]
+
+    @staticmethod
+    def _tile_ids(tmx_data):
+        """Внутренний gid pytmx -> тайл (GID из Tiled, флаги отражения).
+        pytmx нумерует gid в порядке появления тайлов в карте, поэтому версии
+        карты сравниваются только по GID из Tiled"""
+        return {gid: (tiled_gid, flags) for tiled_gid, variants in tmx_data.gidmap.items()
+                for gid, flags in variants}
+
+    @staticmethod
+    def _tile_image(tmx_data, tile):
+        return tmx_data.get_tile_image_by_gid(tmx_data.imagemap[tile][0])
+
+    @classmethod
+    def _read_layout(cls, tmx_data):
+        """Непустые клетки всех тайловых слоёв: (слой, x, y) -> тайл"""
+        tile_ids = cls._tile_ids(tmx_data)
+        layout = {}
+        for index, layer in enumerate(cls._tile_layers(tmx_data)):
+            for x, y, gid in layer:
+                if gid:
+                    layout[(index, x, y)] = tile_ids[gid]
+        return layout
+
+    @classmethod
+    def _hash_tiles(cls, tmx_data, tiles):
+        """Хэши пикселей тайлов: так видно, какие тайлы поменялись в тайлсете"""
+        hashes = {}
+        for tile in set(tiles):
+            image = cls._tile_image(tmx_data, tile)
+            if image:
+                hashes[tile] = hash(pygame.image.tobytes(image, "RGBA"))
+        return hashes
+
+    @staticmethod
+    def _create_tile(key, image, tile_width, tile_height, animation=None, mask=None):
+        """Тайл TMX; маска коллизии - по первому кадру, общая для всех экземпляров GID"""
+        layer, x, y = key
+        platform = Platform(x * tile_width, y * tile_height, tile_width, tile_height,
+                            image=image, mask=mask)
+        platform.layer = layer
+        platform.animation = animation
+        return platform
+
+    def _load_tile_animations(self, tmx_data, tiles):
+        """Анимации тайлов из тайлсетов: по одному TileAnimation на тайл.
+        Существующие объекты обновляются на месте - на них ссылаются платформы"""
+        animated = {}
+        for tile in tiles:
+            properties = tmx_data.get_tile_properties_by_gid(tmx_data.imagemap[tile][0]) or {}
+            frames = properties.get("frames")
+            if frames:
+                animated[tile] = frames
+
+        tile_ids = self._tile_ids(tmx_data)
+        frame_tiles = {tile_ids[frame.gid] for frames in animated.values() for frame in frames}
+        frame_images = self._prepare_tiles(self._scale_tiles_async(tmx_data, frame_tiles))
+        for tile, frames in animated.items():
+            images = [frame_images[tile_ids[frame.gid]] for frame in frames
+                      if frame_images.get(tile_ids[frame.gid])]
+            if len(images) != len(frames):
+                continue
+            durations = [frame.duration for frame in frames]
+            animation = self.tile_animations.get(tile)
+            if animation is None:
+                self.tile_animations[tile] = TileAnimation(images, durations)
+            else:
+                animation.set_frames(images, durations)
+
+    def _scale_tiles_async(self, tmx_data, tiles):
+        """Запускает масштабирование уникальных тайлов в фоне: тайл -> Future"""
+        futures = {}
+        for tile in tiles:
+            image = self._tile_image(tmx_data, tile)
+            if not image:
+                futures[tile] = None
+                continue
+            if self.tile_scale != 1.0:
+                new_width = int(image.get_width() * self.tile_scale)
+                new_height = int(image.get_height() * self.tile_scale)
+                futures[tile] = asset_loader.scale_async(image, (new_width, new_height))
+            else:
+                futures[tile] = asset_loader.completed(image)
+        return futures
+
+    @staticmethod
+    def _tile_masks(tile_images):
+        """Одна маска коллизии на уникальный тайл: тайл -> маска"""
+        return {tile: pygame.mask.from_surface(image) for tile, image in tile_images.items()}
+
+    @staticmethod
+    def _prepare_tiles(futures):
+        """Дожидается масштабирования и готовит каждый уникальный тайл к blit
+        (в главном потоке): тайл -> поверхность, общая для всех экземпляров"""
+        return {tile: surfaces.prepare(future.result()) for tile, future in futures.items() if future}
+
+    def check_map_changes(self):
+        """Вызывается каждый кадр: применяет правки карты, если файлы изменились"""
+        if self.map_watcher is not None and self.map_watcher.poll():
+            try:
+                self.apply_map_changes(self.map_path)
+            except Exception as e:
+                print(f"Не удалось применить правки {self.map_path}: {e}")
 
-        print(f"Карта загружена: {self.level_width}x{self.level_height} (масштаб {self.tile_scale}x)")
+    def apply_map_changes(self, filepath):
+        """Горячая перезагрузка: сравнивает сетку GID из Tiled с загруженной и заменяет
+        только изменённые тайлы. Игрок, NPC и их состояние не трогаются"""
+        import pytmx
+
+        tmx_data = pytmx.load_pygame(filepath)
+        tile_width = int(tmx_data.tilewidth * self.tile_scale)
+        tile_height = int(tmx_data.tileheight * self.tile_scale)
+        if (tmx_data.width * tile_width != self.level_width or
+                tmx_data.height * tile_height != self.level_height):
+            print("Размер карты изменился - полная перезагрузка")
+            self.load_tmx_map(filepath)
+            return
+
+        layout = self._read_layout(tmx_data)
+        hashes = self._hash_tiles(tmx_data, layout.values())
+        # Тайлы, чьи пиксели поменялись в тайлсете, заменяются везде, где стоят
+        redrawn = {tile for tile, value in hashes.items() if self.tile_hashes.get(tile) != value}
+
+        removed = {key for key, (tile, _) in self.tile_layout.items()
+                   if layout.get(key) != tile or tile in redrawn}
+        added = [key for key in layout if key not in self.tile_layout or key in removed]
+
+        dirty = []
+        for key in removed:
+            _, platform = self.tile_layout.pop(key)
+            self.remove_platform(platform)
+            dirty.append(platform.rect)
+
+        self._load_tile_animations(tmx_data, set(layout.values()))
+        tile_images = self._prepare_tiles(
+            self._scale_tiles_async(tmx_data, {layout[key] for key in added}))
+        tile_masks = self._tile_masks(tile_images)
+        for key in added:
+            image = tile_images.get(layout[key])
+            if image:
+                platform = self._create_tile(key, image, tile_width, tile_height,
+                                             self.tile_animations.get(layout[key]),
+                                             tile_masks[layout[key]])
+                self.add_platform(platform)
+                self.tile_layout[key] = (layout[key], platform)
+                dirty.append(platform.rect)
+        self.tile_hashes = hashes
+
+        if dirty:
+            self._patch_navigation(dirty)
+        print(f"Карта обновлена: -{len(removed)} +{len(added)} тайлов")
+
+    def _build_level_mask(self):
+        """Собирает маски всех тайлов в одну маску уровня и сетку для swept AABB"""
+        for _ in self._build_level_mask_steps():
+            pass
+
+    def _build_level_mask_steps(self):
+        self.level_mask = yield from LevelMask.build_steps(
+            self.platforms, self.level_width, self.level_height)
+        self.collision_grid = yield from SpatialGrid.build_steps(
+            self.platforms, TILE_SIZE * COLLISION_GRID_CELL_TILES)
+
+    def add_platform(self, platform):
+        """Добавляет тайл во время игры с инкрементальным обновлением маски"""
+        self.platforms.add(platform)
+        self.all_sprites.add(platform)
+        self.level_mask.add(platform)
+        self.collision_grid.add(platform)
+
+    def remove_platform(self, platform):
+        """Удаляет тайл во время игры с инкрементальным обновлением маски"""
+        platform.kill()
+        self.collision_grid.remove(platform)
+        # Соседей для перерисовки маски ищем через сетку, а не перебором всех тайлов
+        self.level_mask.remove(platform, self.collision_grid.query(platform.rect))
+
+    def _patch_navigation(self, regions):
+        """Обновляет граф навигации только в изменённых областях"""
+        for region in regions:
+            self.navigation.update_region(region, self.collision_grid.query(region))
+        self.path_scheduler.clear()
+        for npc in self.npcs:
+            npc.reset_path()
+
+    def add_player(self):
+        """Дополнительный игрок в точке появления (для сетевых клиентов)"""
+        player = Player(*self.spawn_point, self.player_assets_path)
+        player.particle_rate = self.quality.level.particle_rate
+        self.extra_players.append(player)
+        return player
+
+    def remove_player(self, player):
+        if player in self.extra_players:
+            self.extra_players.remove(player)
+
+    def _build_navigation(self, cell_width, cell_height):
+        """Строит граф навигации NPC один раз на уровень"""
+        for _ in self._build_navigation_steps(cell_width, cell_height):
+            pass
+
+    def _build_navigation_steps(self, cell_width, cell_height):
+        # Путь должен вмещать самого высокого NPC, а не одну клетку
+        body_height = max((npc.rect.height for npc in self.npcs), default=cell_height)
+        self.navigation = yield from NavGraph.build_steps(
+            self.platforms, cell_width, cell_height,
+            self.level_width, self.level_height, math.ceil(body_height / cell_height))
+        self.path_scheduler = PathScheduler(self.navigation)
+
+    def observe_frame(self, frame_ms):
+        """Передаёт время кадра регулятору качества и применяет новый уровень"""
+        self.quality.observe(frame_ms)
+        if self.quality.changed:
+            self._apply_quality()
+
+    def _apply_quality(self):
+        level = self.quality.level
+        for player in [self.player] + self.extra_players:
+            if player is not None:
+                player.particle_rate = level.particle_rate
+        for npc in self.npcs:
+            npc.cloud_render_interval = level.dialog_render_interval
+            npc.offscreen_anim_interval = level.offscreen_anim_interval
 
     def reload_map(self):
         self._load_map()
 
+    def restart(self):
+        """Рестарт уровня из начального снимка, без повторного разбора TMX"""
+        if self.history is None:
+            self.reload_map()
+            return
+        self.history.restore_initial()
+
+    def rewind(self):
+        """Шаг перемотки назад по истории снимков. False - история кончилась"""
+        return self.history is not None and self.history.step_back()
+
     def update(self):
+        # Общие часы анимаций: один тик на кадр вместо счётчика в каждой анимации
+        shared_clock.tick()
+
+        # Фоновая сборка следующего уровня, не дольше бюджета кадра
+        self.levels.process()
+
+        # Поиск путей, отложенный с прошлых кадров
+        self.path_scheduler.process()
+
+        quality = self.quality.level
+        level_mask = self.level_mask if quality.mask_collision else None
+        view = pygame.Rect(int(self.camera_x), int(self.camera_y), VIEW_WIDTH, VIEW_HEIGHT)
+
         # Обновляем NPC с платформами (физика)
         for npc in self.npcs:
-            npc.update(self.player, self.platforms)
+            npc.on_screen = view.colliderect(npc.rect)
+            npc.update(self.player, self.platforms, self.path_scheduler, level_mask,
+                       quality.mask_collision, self.collision_grid)
 
         # Проверяем блокировку движения
         blocked = any(npc.is_blocking() for npc in self.npcs)
 
         # Обновляем игрока только если не заблокирован
         if not blocked:
-            self.player.update(self.platforms)
-        else:
-            keys = pygame.key.get_pressed()
-            if keys[pygame.K_SPACE] or keys[pygame.K_e] or keys[pygame.K_RETURN]:
-                for npc in self.npcs:
-                    if npc.dialog_active:
-                        npc.close_dialog()
-
-        # Камера
-        target_x = self.player.rect.centerx - SCREEN_WIDTH // 2
+            self.player.update(self.platforms, level_mask, self.collision_grid)
+        elif self.player.read_input().interact:
+            for npc in self.npcs:
+                if npc.dialog_active:
+                    npc.close_dialog()
+
+        # Диалог останавливает только основного игрока
+        for player in self.extra_players:
+            player.update(self.platforms, level_mask, self.collision_grid)
+
+        self.follow_camera(self.player.rect)
+
+        if self.exits and self._check_exits():
+            return
+
+        # Снимок для перемотки (раз в SNAPSHOT_INTERVAL тиков)
+        self.history.record()
+
+    def _check_exits(self):
+        """Подготавливает уровень за ближним выходом и переходит, когда игрок в него вошёл"""
+        player_rect = self.player.rect
+        reach = player_rect.inflate(LEVEL_PREBUILD_DISTANCE * 2, LEVEL_PREBUILD_DISTANCE * 2)
+        for index, (rect, path) in enumerate(self.exits):
+            if not reach.colliderect(rect):
+                self.touched_exits.discard(index)
+                continue
+            if not player_rect.colliderect(rect):
+                self.touched_exits.discard(index)
+                self.levels.prebuild(path)
+            elif index not in self.touched_exits:
+                # Срабатывает только на входе: вернувшись, игрок стоит в том же выходе
+                self.touched_exits.add(index)
+                self.switch_level(path)
+                return True
+        return False
+
+    def switch_level(self, path):
+        """Переход на другую карту: из кэша мгновенно, иначе загрузка"""
+        self.levels.switch(path)
+
+    def prebuild_level(self, path):
+        """Начать фоновую сборку карты, на которую скоро перейдём"""
+        self.levels.prebuild(path)
+
+    def follow_camera(self, target):
+        """Плавно ведёт камеру за target в пределах уровня"""
+        target_x = target.centerx - VIEW_WIDTH // 2
         self.camera_x += (target_x - self.camera_x) * CAMERA_SMOOTH
 
-        target_y = self.player.rect.centery - SCREEN_HEIGHT // 2
+        target_y = target.centery - VIEW_HEIGHT // 2
         self.camera_y += (target_y - self.camera_y) * CAMERA_SMOOTH
 
-        max_camera_x = max(0, self.level_width - SCREEN_WIDTH)
-        max_camera_y = max(0, self.level_height - SCREEN_HEIGHT)
+        max_camera_x = max(0, self.level_width - VIEW_WIDTH)
+        max_camera_y = max(0, self.level_height - VIEW_HEIGHT)
 
         self.camera_x = max(0, min(self.camera_x, max_camera_x))
         self.camera_y = max(0, min(self.camera_y, max_camera_y))
 
     def draw(self, surface, clock):
-        # Фон
-        for y in range(SCREEN_HEIGHT):
-            color_val = int(135 - y * 0.1)
-            pygame.draw.line(surface, (color_val, 206, 235), (0, y), (SCREEN_WIDTH, y))
-
-        # Облака
-        for i in range(5):
-            x = (i * 300 - int(self.camera_x * 0.3)) % (SCREEN_WIDTH + 200) - 100
-            y = (50 + i * 30 - int(self.camera_y * 0.1)) % (SCREEN_HEIGHT + 100) - 50
-            pygame.draw.ellipse(surface, (255, 255, 255), (x, y, 120, 40))
-
-        # Платформы
-        for sprite in self.all_sprites:
-            if not isinstance(sprite, (Player, NPC)):
-                surface.blit(sprite.image,
-                             (sprite.rect.x - self.camera_x,
-                              sprite.rect.y - self.camera_y))
-
-        # NPC (рисуем перед игроком)
+        # В родном разрешении мир рисуется в маленькую поверхность
+        world = self.world_surface if self.world_surface is not None else surface
+        self._draw_world(world)
+
+        if self.world_surface is not None:
+            # Одно увеличение за кадр (ближайший сосед)
+            pygame.transform.scale(world, surface.get_size(), surface)
+
+        # Облака диалогов и индикаторы - в экранном разрешении
         for npc in self.npcs:
-            npc.draw(surface, self.camera_x, self.camera_y)
+            npc.draw_overlay(surface, self.camera_x, self.camera_y, PRESENT_SCALE)
 
-        # Игрок
-        self.player.draw(surface, self.camera_x, self.camera_y)
+        self._draw_hud(surface, clock)
+
+    def _draw_world(self, surface):
+        width, height = surface.get_size()
+
+        quality = self.quality.level
+
+        # Фон: градиент рисуется один раз и дальше копируется одним blit
+        if quality.gradient:
+            if self._sky is None or self._sky.get_size() != (width, height):
+                self._sky = pygame.Surface((width, height))
+                for y in range(height):
+                    color_val = int(135 - y * PRESENT_SCALE * 0.1)
+                    pygame.draw.line(self._sky, (color_val, 206, 235), (0, y), (width, y))
+                self._sky = surfaces.prepare(self._sky)
+            surface.blit(self._sky, (0, 0))
+        else:
+            surface.fill((135, 206, 235))
+
+        queue = self.render_queue
+        queue.begin_frame()
+        camera_x = int(self.camera_x)
+        camera_y = int(self.camera_y)
+
+        # Облака: одна заготовка, позиция с параллаксом переводится в мировые координаты
+        unit = WORLD_UNIT
+        if quality.cloud_count and self._cloud is None:
+            self._cloud = pygame.Surface((int(120 * unit), int(40 * unit)), pygame.SRCALPHA)
+            pygame.draw.ellipse(self._cloud, (255, 255, 255), self._cloud.get_rect())
+            self._cloud = surfaces.prepare(self._cloud)
+        for i in range(quality.cloud_count):
+            x = (i * 300 * unit - int(self.camera_x * 0.3)) % (width + 200 * unit) - 100 * unit
+            y = (50 * unit + i * 30 * unit - int(self.camera_y * 0.1)) % (height + 100 * unit) - 50 * unit
+            queue.submit(LAYER_BACKGROUND, self._cloud, x + camera_x, y + camera_y)
+
+        # Платформы: в очередь идут только тайлы из ячеек сетки под камерой,
+        # остальное отсекает очередь. Анимированный тайл берёт кадр из общей анимации своего GID
+        view = pygame.Rect(camera_x, camera_y, width, height)
+        visible = self.collision_grid.query(view) if self.collision_grid is not None else self.platforms
+        for platform in visible:
+            animation = platform.animation
+            image = animation.image if animation is not None else platform.image
+            queue.submit(LAYER_TILES, image, platform.rect.x, platform.rect.y, platform.layer)
+
+        # NPC (z=0) рисуются перед игроком (z=1)
+        for npc in self.npcs:
+            npc.submit(queue)
+
+        for player in self.extra_players:
+            player.submit(queue)
+        self.player.submit(queue)
+
+        queue.flush(surface, camera_x, camera_y)
 
+    def _draw_hud(self, surface, clock):
         # UI подсказка
         blocked = any(npc.is_blocking() for npc in self.npcs)
         if blocked:
@@ -231,7 +706,13 @@ class Game:
         fps_text = font.render(f"FPS: {int(clock.get_fps())}", True, WHITE)
         pos_text = font.render(f"Pos: {int(self.player.rect.x)}, {int(self.player.rect.y)}", True, WHITE)
         state_text = font.render(f"State: {self.player.state}", True, WHITE)
+        quality_text = font.render(f"Quality: {self.quality.level.name}", True, WHITE)
+        stats = self.render_queue.stats
+        render_text = font.render(f"Draw: {stats.drawn}/{stats.submitted} in {stats.batches} blits",
+                                  True, WHITE)
 
         surface.blit(fps_text, (10, 10))
         surface.blit(pos_text, (10, 50))
-        surface.blit(state_text, (10, 90))
\ No newline at end of file
+        surface.blit(state_text, (10, 90))
+        surface.blit(quality_text, (10, 130))
+        surface.blit(render_text, (10, 170))
@@ -0,0 +1,64 @@
+import os
+import xml.etree.ElementTree as ElementTree
+from settings import HOT_RELOAD_POLL_FRAMES
+
+
+def map_dependencies(tmx_path):
+    """Файлы, от которых зависит карта: сам TMX, внешние тайлсеты и их картинки"""
+    paths = [os.path.abspath(tmx_path)]
+    try:
+        root = ElementTree.parse(tmx_path).getroot()
+    except (OSError, ElementTree.ParseError):
+        return paths
+
+    base = os.path.dirname(tmx_path)
+    for tileset in root.iter("tileset"):
+        source = tileset.get("source")
+        if source:
+            tsx_path = os.path.normpath(os.path.join(base, source))
+            paths.append(tsx_path)
+            try:
+                tileset = ElementTree.parse(tsx_path).getroot()
+            except (OSError, ElementTree.ParseError):
+                continue
+            image_base = os.path.dirname(tsx_path)
+        else:
+            image_base = base
+        for image in tileset.iter("image"):
+            if image.get("source"):
+                paths.append(os.path.normpath(os.path.join(image_base, image.get("source"))))
+    return paths
+
+
+def _stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class MapWatcher:
+    """Опрашивает время изменения файлов карты раз в poll_frames кадров"""
+
+    def __init__(self, tmx_path, poll_frames=HOT_RELOAD_POLL_FRAMES):
+        self.tmx_path = tmx_path
+        self.poll_frames = max(1, poll_frames)
+        self._timer = 0
+        self._watch()
+
+    def _watch(self):
+        # Список тайлсетов берётся заново: правка TMX может подключить новый
+        self.paths = map_dependencies(self.tmx_path)
+        self.stamps = {path: _stamp(path) for path in self.paths}
+
+    def poll(self):
+        """True, если с прошлой проверки какой-то файл карты изменился"""
+        self._timer += 1
+        if self._timer < self.poll_frames:
+            return False
+        self._timer = 0
+        if all(_stamp(path) == stamp for path, stamp in self.stamps.items()):
+            return False
+        self._watch()
+        return True
@@ -0,0 +1,167 @@
+import os
+import time
+from collections import OrderedDict
+import pygame
+import asset_loader
+from settings import LEVEL_CACHE_SIZE, LEVEL_PREBUILD_BUDGET_MS
+from snapshot import SnapshotHistory
+
+# Всё, что принадлежит уровню: тайлы, коллизии, навигация, сущности и камера
+LEVEL_STATE = (
+    "map_path", "platforms", "all_sprites", "npcs", "player", "extra_players",
+    "spawn_point", "camera_x", "camera_y", "level_width", "level_height",
+    "tile_layout", "tile_hashes", "tile_animations", "map_watcher", "exits", "touched_exits",
+    "level_mask", "collision_grid", "navigation", "path_scheduler", "history",
+)
+
+
+def level_key(path):
+    return os.path.abspath(path) if path else None
+
+
+class Level:
+    """Полностью построенный уровень, отцепленный от Game"""
+
+    def __init__(self):
+        self.map_path = None
+        self.platforms = pygame.sprite.Group()
+        self.all_sprites = pygame.sprite.Group()
+        self.npcs = pygame.sprite.Group()
+        self.player = None
+        self.extra_players = []
+        self.spawn_point = (0, 0)
+        self.camera_x = 0
+        self.camera_y = 0
+        self.level_width = 0
+        self.level_height = 0
+        self.tile_layout = {}
+        self.tile_hashes = {}
+        self.tile_animations = {}
+        self.map_watcher = None
+        self.exits = []
+        self.touched_exits = set()
+        self.level_mask = None
+        self.collision_grid = None
+        self.navigation = None
+        self.path_scheduler = None
+        self.history = None
+
+    def store(self, game):
+        """Забирает состояние активного уровня из game (копируются только ссылки)"""
+        for name in LEVEL_STATE:
+            setattr(self, name, getattr(game, name))
+        return self
+
+    def attach(self, game):
+        """Делает уровень активным: O(1), ничего не перестраивается"""
+        for name in LEVEL_STATE:
+            setattr(game, name, getattr(self, name))
+
+
+class LevelManager:
+    """LRU-кэш построенных уровней и фоновая подготовка следующего уровня"""
+
+    def __init__(self, game, capacity=LEVEL_CACHE_SIZE, budget_ms=LEVEL_PREBUILD_BUDGET_MS):
+        self.game = game
+        self.capacity = max(0, capacity)
+        self.budget_ms = budget_ms
+        self.cache = OrderedDict()  # путь -> Level (неактивные, от старых к свежим)
+        self._builds = OrderedDict()  # путь -> (Level, генератор build_tmx_map)
+
+    def switch(self, path):
+        """Переключает уровень: из кэша - мгновенно, иначе достраивает или грузит"""
+        game = self.game
+        key = level_key(path)
+        active_key = level_key(game.map_path)
+        if key == active_key:
+            return
+
+        previous = Level().store(game)
+        level = self.cache.pop(key, None)
+        if level is None and key in self._builds:
+            level = self._finish_build(key)
+
+        if level is not None:
+            level.attach(game)
+            # Пока уровень лежал в кэше, качество могло смениться
+            game._apply_quality()
+            if game.history is None:
+                game.history = SnapshotHistory(game)  # уровень собран в фоне
+        else:
+            Level().attach(game)
+            try:
+                game.load_tmx_map(path)
+            except Exception as e:
+                print(f"Не удалось загрузить {path}: {e}")
+                previous.attach(game)
+                return
+
+        self._remember(active_key, previous)
+        print(f"Уровень: {os.path.basename(path)} (в кэше {len(self.cache)})")
+
+    def _remember(self, key, level):
+        if key is None or self.capacity == 0:
+            return
+        self.cache[key] = level
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.capacity:
+            evicted, _ = self.cache.popitem(last=False)
+            print(f"Уровень выгружен из кэша: {os.path.basename(evicted)}")
+
+    def prebuild(self, path):
+        """Ставит уровень в очередь фоновой сборки (по кусочку за кадр)"""
+        key = level_key(path)
+        if (key == level_key(self.game.map_path) or key in self.cache or key in self._builds
+                or not os.path.exists(path)):
+            return
+        # Генератор стартует только в _step, когда собираемый уровень подставлен в game
+        self._builds[key] = (Level(), self.game.build_tmx_map(path, background=True))
+
+    def _step(self, level, generator, deadline=None):
+        """Продвигает сборку до deadline (None - до конца). True - уровень готов.
+        Активный уровень подменяется один раз на весь вызов"""
+        game = self.game
+        active = Level().store(game)
+        level.attach(game)
+        try:
+            while deadline is None or time.perf_counter() < deadline:
+                waiting = next(generator)
+                if waiting:
+                    if deadline is not None:
+                        break  # не отнимаем GIL у потоков загрузчика до следующего кадра
+                    asset_loader.wait_all(waiting)
+        except StopIteration:
+            return True
+        finally:
+            level.store(game)
+            active.attach(game)
+        return False
+
+    def process(self):
+        """Вызывается каждый кадр: продвигает сборку не дольше budget_ms"""
+        if not self._builds:
+            return
+        key, (level, generator) = next(iter(self._builds.items()))
+        deadline = time.perf_counter() + self.budget_ms / 1000
+        try:
+            done = self._step(level, generator, deadline)
+        except Exception as e:
+            del self._builds[key]
+            print(f"Не удалось подготовить {key}: {e}")
+            return
+        if done:
+            del self._builds[key]
+            self._remember(key, level)
+
+    def _finish_build(self, key):
+        level, generator = self._builds.pop(key)
+        try:
+            self._step(level, generator)
+        except Exception as e:
+            print(f"Не удалось подготовить {key}: {e}")
+            return None
+        return level
+
+    @property
+    def building(self):
+        return list(self._builds)
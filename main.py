@@ -1,18 +1,81 @@
-import pygame
+import time
+
+PROCESS_START = time.perf_counter()  # отсчёт холодного старта - как можно раньше
+
 import sys
 import os
-from settings import SCREEN_WIDTH, SCREEN_HEIGHT, FPS, DEFAULT_MAP
-from game import Game
+from startup import StartupProfiler, init_pygame
+
+profiler = StartupProfiler(PROCESS_START)
+
+with profiler.phase("import"):
+    import pygame
+    from settings import (SCREEN_WIDTH, SCREEN_HEIGHT, FPS, DEFAULT_MAP, MAPS_DIR, WHITE,
+                          PLAYER_ASSETS_DIR, NPC_ASSETS_DIR, STARTUP_REPORT_PATH)
+    import asset_loader
+
+
+def show_loading_screen(screen, clock, futures):
+    """Рисует экран загрузки, пока фоновые задачи не завершатся. False - окно закрыли"""
+    font = pygame.font.Font(None, 36)
+    while not asset_loader.wait_all(futures, timeout=0):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+
+        progress = asset_loader.progress(futures)
+        screen.fill((20, 20, 30))
+        bar = pygame.Rect(0, 0, SCREEN_WIDTH // 2, 24)
+        bar.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+        pygame.draw.rect(screen, WHITE, bar, 2)
+        pygame.draw.rect(screen, WHITE, (bar.x, bar.y, int(bar.width * progress), bar.height))
+        text = font.render(f"Загрузка... {int(progress * 100)}%", True, WHITE)
+        screen.blit(text, (bar.centerx - text.get_width() // 2, bar.y - 40))
+        pygame.display.flip()
+        profiler.mark("loading_screen")
+        clock.tick(FPS)
+    return True
+
+
+def step_frame(game, screen=None, clock=None):
+    """Тик симуляции и (если передан экран) отрисовка"""
+    # Удерживаемый BACKSPACE перематывает время назад вместо обычного тика
+    if not (pygame.key.get_pressed()[pygame.K_BACKSPACE] and game.rewind()):
+        game.update()
+    if screen is not None:
+        game.draw(screen, clock)
 
 
 def main():
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    pygame.display.set_caption("Pygame Platformer")
-    clock = pygame.time.Clock()
+    with profiler.phase("init"):
+        # Только дисплей, события и шрифты - без звука
+        init_pygame()
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pygame.display.set_caption("Pygame Platformer")
+        clock = pygame.time.Clock()
+
+    with profiler.phase("import"):
+        # Модули игры импортируются после появления окна
+        from player import Player
+        from npc import NPC
+        from game import Game
+        from memory_report import report as memory_report
+        from profiler import ProfileCapture, frames_from_env
+
+    with profiler.phase("asset_load"):
+        # Кадры декодируются в фоновых потоках, пока виден экран загрузки
+        futures = Player.preload_assets(PLAYER_ASSETS_DIR) + NPC.preload_assets(NPC_ASSETS_DIR)
+        if not show_loading_screen(screen, clock, futures):
+            pygame.quit()
+            sys.exit()
 
-    # Автоматическая загрузка карты из assets/maps/map.tmx
-    game = Game()
+    with profiler.phase("map_load"):
+        # Автоматическая загрузка карты из assets/maps/map.tmx
+        game = Game()
     running = True
+    # Захват профиля существует только во время записи: иначе цикл его не касается
+    capture_frames = frames_from_env()
+    capture = ProfileCapture(capture_frames) if capture_frames else None
 
     while running:
         for event in pygame.event.get():
@@ -22,20 +85,57 @@ def main():
                 if event.key == pygame.K_ESCAPE:
                     running = False
                 if event.key == pygame.K_r:
-                    # Перезагрузка текущей карты
-                    game.reload_map()
+                    # Мгновенный рестарт из начального снимка уровня
+                    game.restart()
                 if event.key == pygame.K_F5:  # Исправлено: K_F5 вместо K_f5
                     # Принудительная перезагрузка из map.tmx
                     if os.path.exists(DEFAULT_MAP):
                         game.load_tmx_map(DEFAULT_MAP)
                     else:
                         game._create_demo_level()
+                if event.key == pygame.K_F9:
+                    # Отчёт о памяти по подсистемам + снимок в файл
+                    memory_report(game)
+                if event.key in (pygame.K_PAGEUP, pygame.K_PAGEDOWN):
+                    # Соседняя карта из assets/maps; посещённые берутся из кэша уровней
+                    maps = sorted(os.path.join(MAPS_DIR, name) for name in os.listdir(MAPS_DIR)
+                                  if name.endswith(".tmx")) if os.path.isdir(MAPS_DIR) else []
+                    if maps:
+                        current = os.path.abspath(game.map_path)
+                        index = next((i for i, path in enumerate(maps)
+                                      if os.path.abspath(path) == current), -1)
+                        index += 1 if event.key == pygame.K_PAGEDOWN else -1
+                        game.switch_level(maps[index % len(maps)])
+                if event.key == pygame.K_F10 and capture is None:
+                    # Профиль следующих PROFILE_DEFAULT_FRAMES кадров
+                    capture = ProfileCapture()
 
-        game.update()
-        game.draw(screen, clock)
+        # Правки map.tmx и тайлсетов применяются на лету, без потери состояния
+        game.check_map_changes()
+
+        if capture is None:
+            step_frame(game, screen, clock)
+        else:
+            with capture.phase("update"):
+                step_frame(game)
+            with capture.phase("draw"):
+                game.draw(screen, clock)
+            if capture.end_frame():
+                capture.stop()
+                capture = None
         pygame.display.flip()
+
+        if "first_frame" not in profiler.milestones:
+            profiler.mark("first_frame")
+            print(profiler.format())
+            profiler.write_report(STARTUP_REPORT_PATH)
+
         clock.tick(FPS)
+        # Время работы кадра без ожидания - для регулятора качества
+        game.observe_frame(clock.get_rawtime())
 
+    if capture is not None:
+        capture.stop()  # окно закрыли посреди захвата - сохраняем то, что успели
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,203 @@
+import json
+import os
+import sys
+import time
+import hashlib
+import pygame
+from settings import MEMORY_SNAPSHOT_PATH
+
+
+def surface_bytes(surface):
+    """Память пикселей поверхности (подповерхности делят память с родителем)"""
+    if surface.get_parent() is not None:
+        return 0
+    return surface.get_pitch() * surface.get_height()
+
+
+def mask_bytes(mask):
+    """Маска хранит один бит на пиксель, строки выровнены по машинному слову"""
+    width, height = mask.get_size()
+    word_bits = 64
+    return ((width + word_bits - 1) // word_bits) * (word_bits // 8) * height
+
+
+class MemoryReport:
+    """Обходит живой граф объектов Game и считает байты по подсистемам"""
+
+    CATEGORIES = ("tiles", "masks", "animation_frames", "text", "entities", "cached_levels")
+
+    def __init__(self, game):
+        self.game = game
+        self.bytes = {name: 0 for name in self.CATEGORIES}
+        self.counts = {name: 0 for name in self.CATEGORIES}
+        self.duplicates = []
+        self._seen = set()
+        self._surfaces_by_hash = {}
+        self._collect()
+
+    # --- Учёт ---
+
+    def _add_surface(self, category, surface):
+        if surface is None or id(surface) in self._seen:
+            return
+        self._seen.add(id(surface))
+        size = surface_bytes(surface)
+        self.bytes[category] += size
+        self.counts[category] += 1
+
+        # Поиск поверхностей с одинаковым содержимым
+        digest = hashlib.blake2b(pygame.image.tobytes(surface, "RGBA"),
+                                 digest_size=16).hexdigest()
+        key = (surface.get_size(), digest)
+        self._surfaces_by_hash.setdefault(key, []).append((category, size))
+
+    def _add_mask(self, mask):
+        if mask is None or id(mask) in self._seen:
+            return
+        self._seen.add(id(mask))
+        self.bytes["masks"] += mask_bytes(mask)
+        self.counts["masks"] += 1
+
+    def _add_entity(self, obj):
+        if id(obj) in self._seen:
+            return
+        self._seen.add(id(obj))
+        self.bytes["entities"] += sys.getsizeof(obj) + sys.getsizeof(obj.__dict__)
+        self.counts["entities"] += 1
+
+    def _add_cached_level(self, level):
+        """Неактивный уровень из кэша: его тайлы и маски идут отдельной строкой"""
+        before = {name: (self.bytes[name], self.counts[name]) for name in ("tiles", "masks")}
+        for platform in level.platforms:
+            self._add_surface("tiles", platform.image)
+            self._add_mask(getattr(platform, "mask", None))
+        if level.level_mask is not None:
+            for stripe in level.level_mask.stripes:
+                self._add_mask(stripe)
+        for name, (size, count) in before.items():
+            self.bytes["cached_levels"] += self.bytes[name] - size
+            self.bytes[name] = size
+            self.counts[name] = count
+        self.counts["cached_levels"] += 1
+
+    def _add_animations(self, anim_manager):
+        for animation in anim_manager.animations.values():
+            if not animation.loaded:
+                continue  # ленивые анимации ещё не занимают память
+            for frame in animation.frames:
+                self._add_surface("animation_frames", frame)
+
+    def _collect(self):
+        game = self.game
+
+        for platform in game.platforms:
+            self._add_entity(platform)
+            self._add_surface("tiles", platform.image)
+            self._add_mask(getattr(platform, "mask", None))
+
+        for animation in game.tile_animations.values():
+            for frame in animation.frames:
+                self._add_surface("tiles", frame)
+
+        if game.level_mask is not None:
+            for stripe in game.level_mask.stripes:
+                self._add_mask(stripe)
+
+        for npc in game.npcs:
+            self._add_entity(npc)
+            self._add_animations(npc.anim_manager)
+            self._add_surface("animation_frames", npc.image)
+            self._add_mask(npc.mask)
+            self._add_surface("text", npc.cloud_surface)
+
+        player = game.player
+        if player is not None:
+            self._add_entity(player)
+            self._add_animations(player.anim_manager)
+            self._add_surface("animation_frames", player.image)
+            self._add_mask(player.body_mask)
+            for projectile in player.projectiles:
+                self._add_entity(projectile)
+                self._add_surface("entities", projectile.image)
+                self._add_mask(projectile.mask)
+            for particle in player.particles:
+                self._add_entity(particle)
+
+        for level in game.levels.cache.values():
+            self._add_cached_level(level)
+
+        for (size, _), entries in self._surfaces_by_hash.items():
+            if len(entries) > 1:
+                wasted = sum(entry_size for _, entry_size in entries[1:])
+                self.duplicates.append({
+                    "size": list(size),
+                    "copies": len(entries),
+                    "category": entries[0][0],
+                    "wasted_bytes": wasted,
+                })
+        self.duplicates.sort(key=lambda item: item["wasted_bytes"], reverse=True)
+
+    # --- Вывод ---
+
+    @property
+    def total(self):
+        return sum(self.bytes.values())
+
+    def to_dict(self):
+        return {
+            "timestamp": time.time(),
+            "map": self.game.map_path,
+            "level_size": [self.game.level_width, self.game.level_height],
+            "bytes": dict(self.bytes),
+            "counts": dict(self.counts),
+            "total_bytes": self.total,
+            "duplicate_bytes": sum(item["wasted_bytes"] for item in self.duplicates),
+            "duplicates": self.duplicates,
+        }
+
+    def format(self, top_duplicates=5):
+        lines = ["Память по подсистемам:"]
+        for name in self.CATEGORIES:
+            lines.append(f"  {name:<17} {self.bytes[name] / 1024:>10.1f} КБ  ({self.counts[name]} объектов)")
+        lines.append(f"  {'всего':<17} {self.total / 1024:>10.1f} КБ")
+
+        if self.duplicates:
+            wasted = sum(item["wasted_bytes"] for item in self.duplicates)
+            lines.append(f"Одинаковые поверхности: {len(self.duplicates)} групп, "
+                         f"{wasted / 1024:.1f} КБ можно сэкономить")
+            for item in self.duplicates[:top_duplicates]:
+                width, height = item["size"]
+                lines.append(f"  {width}x{height} x{item['copies']} ({item['category']}): "
+                             f"{item['wasted_bytes'] / 1024:.1f} КБ")
+        return "\n".join(lines)
+
+    def write_snapshot(self, path=MEMORY_SNAPSHOT_PATH):
+        """Дописывает снимок в JSON Lines файл для сравнения между загрузками и сборками"""
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.to_dict(), ensure_ascii=False) + "\n")
+        return path
+
+
+def report(game, snapshot_path=MEMORY_SNAPSHOT_PATH):
+    """Печатает отчёт и сохраняет снимок (горячая клавиша F9)"""
+    memory = MemoryReport(game)
+    print(memory.format())
+    if snapshot_path:
+        memory.write_snapshot(snapshot_path)
+        print(f"Снимок памяти записан в {snapshot_path}")
+    return memory
+
+
+def main():
+    """Запуск без окна: python memory_report.py [путь к карте]"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    from settings import SCREEN_WIDTH, SCREEN_HEIGHT
+    from game import Game
+
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    map_path = sys.argv[1] if len(sys.argv) > 1 else None
+    report(Game(map_path=map_path))
+
+
+if __name__ == "__main__":
+    main()
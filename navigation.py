@@ -0,0 +1,338 @@
+import heapq
+import math
+import time
+from collections import OrderedDict, deque
+from collision import run_steps
+from settings import (PLAYER_JUMP_POWER, GRAVITY, PLAYER_SPEED,
+                      NAV_PATH_CACHE_SIZE, NAV_SEARCH_BUDGET_MS, NAV_EXPANSIONS_PER_STEP,
+                      LEVEL_BUILD_CHUNK)
+
+
+class NavGraph:
+    """Граф навигации по сетке тайлов: ходьба, прыжки и падения"""
+
+    def __init__(self, solid, cell_width, cell_height, body_cells=1, build=True):
+        self.solid = solid  # solid[row][col] -> bool
+        self.rows = len(solid)
+        self.cols = len(solid[0]) if solid else 0
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.body_cells = max(1, body_cells)
+
+        # Возможности прыжка считаются из физики игрока
+        jump_height = PLAYER_JUMP_POWER ** 2 / (2 * GRAVITY)
+        air_time = 2 * abs(PLAYER_JUMP_POWER) / GRAVITY
+        self.jump_cells = int(jump_height // cell_height)
+        self.reach_cells = max(1, int(PLAYER_SPEED * air_time // cell_width))
+
+        self.edges = {}
+        if build:
+            for _ in self.build_edges():
+                pass
+
+    @classmethod
+    def from_platforms(cls, platforms, cell_width, cell_height,
+                       level_width, level_height, body_cells=1):
+        """Строит граф, растеризуя прямоугольники платформ в сетку"""
+        return run_steps(cls.build_steps(platforms, cell_width, cell_height,
+                                         level_width, level_height, body_cells))
+
+    @classmethod
+    def build_steps(cls, platforms, cell_width, cell_height,
+                    level_width, level_height, body_cells=1, chunk=LEVEL_BUILD_CHUNK):
+        """Постройка по частям: генератор уступает управление каждые chunk тайлов
+        или клеток сетки, граф - значение StopIteration"""
+        cols = max(1, math.ceil(level_width / cell_width))
+        rows = max(1, math.ceil(level_height / cell_height))
+        solid = [[False] * cols for _ in range(rows)]
+
+        for index, platform in enumerate(platforms, 1):
+            if index % chunk == 0:
+                yield
+            rect = platform.rect
+            col_start = max(0, rect.left // cell_width)
+            col_end = min(cols - 1, (rect.right - 1) // cell_width)
+            row_start = max(0, rect.top // cell_height)
+            row_end = min(rows - 1, (rect.bottom - 1) // cell_height)
+            for row in range(row_start, row_end + 1):
+                line = solid[row]
+                for col in range(col_start, col_end + 1):
+                    line[col] = True
+
+        graph = cls(solid, cell_width, cell_height, body_cells, build=False)
+        yield from graph.build_edges(chunk)
+        return graph
+
+    def update_region(self, region, platforms):
+        """Пересчитывает клетки под region и рёбра в задетых столбцах
+        (platforms - тайлы, пересекающие region)"""
+        col_start = max(0, region.left // self.cell_width)
+        col_end = min(self.cols - 1, (region.right - 1) // self.cell_width)
+        row_start = max(0, region.top // self.cell_height)
+        row_end = min(self.rows - 1, (region.bottom - 1) // self.cell_height)
+        if col_start > col_end or row_start > row_end:
+            return
+
+        for row in range(row_start, row_end + 1):
+            for col in range(col_start, col_end + 1):
+                self.solid[row][col] = False
+        for platform in platforms:
+            rect = platform.rect
+            for row in range(max(row_start, rect.top // self.cell_height),
+                             min(row_end, (rect.bottom - 1) // self.cell_height) + 1):
+                for col in range(max(col_start, rect.left // self.cell_width),
+                                 min(col_end, (rect.right - 1) // self.cell_width) + 1):
+                    self.solid[row][col] = True
+
+        # Рёбра зависят от соседей на дальность прыжка по горизонтали и от всего столбца ниже
+        margin = self.reach_cells + 1
+        for col in range(max(0, col_start - margin), min(self.cols, col_end + margin + 1)):
+            for row in range(self.rows):
+                if self.is_standable(col, row):
+                    self.edges[(col, row)] = self._compute_edges(col, row)
+                else:
+                    self.edges.pop((col, row), None)
+
+    # --- Сетка ---
+
+    def is_solid(self, col, row):
+        if col < 0 or col >= self.cols:
+            return True
+        if row < 0 or row >= self.rows:
+            return False
+        return self.solid[row][col]
+
+    def is_free(self, col, row):
+        """Клетка свободна для тела высотой body_cells (row - клетка ног)"""
+        for r in range(row - self.body_cells + 1, row + 1):
+            if self.is_solid(col, r):
+                return False
+        return True
+
+    def is_standable(self, col, row):
+        return (0 <= row < self.rows and self.is_free(col, row)
+                and self.is_solid(col, row + 1) and row + 1 < self.rows)
+
+    # --- Построение рёбер ---
+
+    def build_edges(self, chunk=LEVEL_BUILD_CHUNK):
+        """Рёбра всех клеток; генератор уступает управление каждые chunk клеток"""
+        for row in range(self.rows):
+            for col in range(self.cols):
+                if self.is_standable(col, row):
+                    self.edges[(col, row)] = self._compute_edges(col, row)
+                # Строки бывают длинными: шаг - по клеткам, а не по строкам
+                if (row * self.cols + col + 1) % chunk == 0:
+                    yield
+
+    def _compute_edges(self, col, row):
+        result = []
+
+        for step in (-1, 1):
+            # Ходьба
+            if self.is_standable(col + step, row):
+                result.append(((col + step, row), 1.0, 'walk'))
+            # Падение с края
+            elif self.is_free(col + step, row):
+                landing = self._fall_from(col + step, row)
+                if landing is not None:
+                    drop = landing[1] - row
+                    result.append((landing, 1.0 + drop * 0.5, 'fall'))
+
+        # Прыжки: вверх на jump_cells и вбок на reach_cells
+        for dy in range(-self.jump_cells, 1):
+            for dx in range(-self.reach_cells, self.reach_cells + 1):
+                if dx == 0 and dy == 0:
+                    continue
+                if dy == 0 and abs(dx) == 1:
+                    continue  # это обычная ходьба
+                target = (col + dx, row + dy)
+                if not self.is_standable(*target):
+                    continue
+                if self._jump_clear(col, row, dx, dy):
+                    cost = 2.0 + abs(dx) + abs(dy)
+                    result.append((target, cost, 'jump'))
+
+        return result
+
+    def _fall_from(self, col, row):
+        """Возвращает клетку приземления при падении вниз по столбцу"""
+        for r in range(row, self.rows - 1):
+            if not self.is_free(col, r):
+                return None
+            if self.is_solid(col, r + 1):
+                return (col, r)
+        return None
+
+    def _jump_clear(self, col, row, dx, dy):
+        """Проверяет, что над траекторией прыжка нет препятствий"""
+        top = row - self.jump_cells
+        step = 1 if dx >= 0 else -1
+        for c in range(col, col + dx + step, step):
+            for r in range(top, row + 1):
+                # Над целевой клеткой пространство ниже неё не важно
+                if c == col + dx and r > row + dy:
+                    continue
+                if r >= 0 and self.is_solid(c, r):
+                    return False
+        return True
+
+    # --- Запросы ---
+
+    def node_at(self, x, y):
+        """Ближайшая узловая клетка для точки ног (x, y) в пикселях"""
+        col = int(x // self.cell_width)
+        row = int((y - 1) // self.cell_height)
+        if col < 0 or col >= self.cols:
+            return None
+        # Платформы не выровнены по сетке: ноги могут оказаться в твёрдой клетке
+        while row > 0 and self.is_solid(col, row):
+            row -= 1
+        for r in range(max(0, row), self.rows):
+            if (col, r) in self.edges:
+                return (col, r)
+        return None
+
+    def node_position(self, node):
+        """Пиксельная точка ног (центр снизу) узла"""
+        col, row = node
+        return ((col + 0.5) * self.cell_width, (row + 1) * self.cell_height)
+
+    def search(self, start, goal, expansions_per_step=NAV_EXPANSIONS_PER_STEP):
+        """A* по частям: генератор уступает управление каждые expansions_per_step
+        раскрытых узлов, путь - значение StopIteration (список или None)"""
+        if start not in self.edges or goal not in self.edges:
+            return None
+        if start == goal:
+            return []
+
+        def heuristic(node):
+            return abs(node[0] - goal[0]) + abs(node[1] - goal[1])
+
+        open_heap = [(heuristic(start), 0.0, start)]
+        came_from = {start: None}
+        cost_so_far = {start: 0.0}
+        expanded = 0
+
+        while open_heap:
+            _, cost, current = heapq.heappop(open_heap)
+            if current == goal:
+                break
+            if cost > cost_so_far[current]:
+                continue
+            for neighbor, edge_cost, kind in self.edges[current]:
+                new_cost = cost + edge_cost
+                if new_cost < cost_so_far.get(neighbor, math.inf):
+                    cost_so_far[neighbor] = new_cost
+                    came_from[neighbor] = (current, kind)
+                    heapq.heappush(open_heap,
+                                   (new_cost + heuristic(neighbor), new_cost, neighbor))
+            expanded += 1
+            if expanded % expansions_per_step == 0:
+                yield
+
+        if goal not in came_from:
+            return None
+
+        path = []
+        node = goal
+        while came_from[node] is not None:
+            previous, kind = came_from[node]
+            path.append((node, kind))
+            node = previous
+        path.reverse()
+        return path
+
+
+class PathCache:
+    """LRU-кэш недавних путей"""
+
+    def __init__(self, max_size=NAV_PATH_CACHE_SIZE):
+        self.max_size = max_size
+        self._paths = OrderedDict()
+
+    def get(self, key):
+        if key in self._paths:
+            self._paths.move_to_end(key)
+            return self._paths[key]
+        return None
+
+    def contains(self, key):
+        return key in self._paths
+
+    def put(self, key, path):
+        self._paths[key] = path
+        self._paths.move_to_end(key)
+        while len(self._paths) > self.max_size:
+            self._paths.popitem(last=False)
+
+    def clear(self):
+        self._paths.clear()
+
+
+class PathScheduler:
+    """Распределяет поиск путей по кадрам, чтобы не было всплесков"""
+
+    def __init__(self, graph, cache_size=NAV_PATH_CACHE_SIZE, budget_ms=NAV_SEARCH_BUDGET_MS):
+        self.graph = graph
+        self.cache = PathCache(cache_size)
+        self.budget_ms = budget_ms
+        self._queue = deque()
+        self._pending = {}
+        self._active = None  # (id объекта, ключ, callback, генератор поиска)
+
+    def request(self, requester, start_pos, goal_pos, callback):
+        """Ставит запрос пути в очередь. Ответ из кэша приходит сразу"""
+        start = self.graph.node_at(*start_pos)
+        goal = self.graph.node_at(*goal_pos)
+        if start is None or goal is None:
+            callback(None)
+            return
+
+        key = (start, goal)
+        if self.cache.contains(key):
+            callback(self.cache.get(key))
+            return
+
+        # Один активный запрос на объект: новый заменяет старый
+        self._pending[id(requester)] = (key, callback)
+        self._queue.append(id(requester))
+
+    def process(self):
+        """Ищет пути не дольше budget_ms за кадр; длинный поиск продолжается в следующем кадре"""
+        deadline = time.perf_counter() + self.budget_ms / 1000
+        while time.perf_counter() < deadline:
+            if self._active is None and not self._start_next():
+                return
+            requester_id, key, callback, search = self._active
+            try:
+                next(search)
+            except StopIteration as done:
+                self._active = None
+                self.cache.put(key, done.value)
+                # Пока искали, объект мог попросить другой путь - тогда ответ только в кэш
+                if requester_id not in self._pending:
+                    callback(done.value)
+
+    def _start_next(self):
+        """Берёт следующий запрос: из кэша отвечает сразу, иначе начинает поиск"""
+        while self._queue:
+            requester_id = self._queue.popleft()
+            entry = self._pending.pop(requester_id, None)
+            if entry is None:
+                continue  # запрос уже обработан или заменён
+            key, callback = entry
+            if self.cache.contains(key):
+                callback(self.cache.get(key))
+                continue
+            self._active = (requester_id, key, callback, self.graph.search(*key))
+            return True
+        return False
+
+    def clear(self):
+        """Граф изменился: забываем пути и прерываем текущий поиск"""
+        self.cache.clear()
+        # Запросы по старому графу отбрасываются: NPC попросят новые по своим таймерам
+        self._active = None
+        self._queue.clear()
+        self._pending.clear()
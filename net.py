@@ -0,0 +1,230 @@
+import struct
+from settings import NET_MAX_PACKET, NET_POSITION_QUANTUM, NET_RELEVANCE_RADIUS
+from snapshot import PLAYER_STATES
+
+# Типы сообщений
+MSG_INPUT = 1      # клиент -> сервер: подтверждённый тик + кнопки
+MSG_BYE = 2        # клиент -> сервер: отключение
+MSG_SNAPSHOT = 3   # сервер -> клиент: дельта относительно подтверждённого снимка
+
+INPUT = struct.Struct("<BIB")             # тип, последний полученный тик, кнопки
+SNAPSHOT_HEADER = struct.Struct("<BIIH")  # тип, тик, базовый тик (0 - полный снимок), id игрока клиента
+
+# Виды сущностей. У всех первые два поля - квантованные x, y
+KIND_PLAYER = 1      # x, y, смотрит вправо, состояние, кадр
+KIND_NPC = 2         # x, y, номер NPC на уровне, анимация, кадр, символов диалога, флаги диалога
+KIND_PROJECTILE = 3  # x, y
+
+NPC_DIALOG_ACTIVE = 1
+NPC_DIALOG_SHOWN = 2
+NPC_DIALOG_FINISHED = 4
+
+
+def quantize(value):
+    return int(round(value / NET_POSITION_QUANTUM))
+
+
+def dequantize(value):
+    return value * NET_POSITION_QUANTUM
+
+
+def animation_names(anim_manager):
+    return sorted(anim_manager.animations)
+
+
+def _frame_index(anim_manager):
+    animation = anim_manager.current_animation
+    return animation.current_frame if animation is not None else 0
+
+
+class EntityIds:
+    """Выдаёт объектам симуляции короткие сетевые id (хранятся в атрибуте net_id)"""
+
+    def __init__(self):
+        self._next = 1
+
+    def get(self, obj):
+        net_id = getattr(obj, "net_id", None)
+        if net_id is None:
+            net_id = self._next
+            self._next = self._next % 0xFFFF + 1  # 16 бит, 0 не используется
+            obj.net_id = net_id
+        return net_id
+
+
+def capture_world(game, ids):
+    """Квантованное состояние мира: net_id -> (вид, кортеж целых полей)"""
+    world = {}
+    players = [game.player] + game.extra_players
+    for player in players:
+        anim = player.anim_manager
+        world[ids.get(player)] = (KIND_PLAYER, (
+            quantize(player.rect.x), quantize(player.rect.y), int(player.facing_right),
+            PLAYER_STATES.index(player.state), _frame_index(anim)))
+
+    for slot, npc in enumerate(game.npcs):
+        anim = npc.anim_manager
+        names = animation_names(anim)
+        anim_index = names.index(anim.current_name) if anim.current_name in names else 0
+        flags = ((NPC_DIALOG_ACTIVE if npc.dialog_active else 0) |
+                 (NPC_DIALOG_SHOWN if npc.dialog_shown else 0) |
+                 (NPC_DIALOG_FINISHED if npc.dialog_finished else 0))
+        world[ids.get(npc)] = (KIND_NPC, (
+            quantize(npc.rect.x), quantize(npc.rect.y), slot, anim_index, _frame_index(anim),
+            npc.text_index, flags))
+
+    for player in players:
+        for projectile in player.projectiles:
+            world[ids.get(projectile)] = (KIND_PROJECTILE, (
+                quantize(projectile.x), quantize(projectile.rect.y)))
+    return world
+
+
+def _write_varint(buffer, value):
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+
+def _encode_entity(buffer, net_id, entity, base_entity):
+    kind, fields = entity
+    if base_entity is None or base_entity[0] != kind:
+        base_fields = (0,) * len(fields)
+    else:
+        base_fields = base_entity[1]
+    _write_varint(buffer, net_id)
+    buffer.append(kind)
+    mask = 0
+    deltas = []
+    for i, (value, base_value) in enumerate(zip(fields, base_fields)):
+        if value != base_value:
+            mask |= 1 << i
+            deltas.append(value - base_value)
+    buffer.append(mask)
+    for delta in deltas:
+        _write_varint(buffer, _zigzag(delta))
+
+
+def encode_snapshot(tick, base_tick, base, world, you, max_size=NET_MAX_PACKET):
+    """Дельта мира относительно base для одного клиента.
+    Возвращает (пакет, состояние, которое клиент получит после применения пакета)"""
+    origin = world.get(you)
+    ox, oy = origin[1][:2] if origin is not None else (0, 0)
+    radius = NET_RELEVANCE_RADIUS / NET_POSITION_QUANTUM
+
+    def distance(entity):
+        x, y = entity[1][:2]
+        return max(abs(x - ox), abs(y - oy))
+
+    if origin is not None:
+        relevant = {net_id: entity for net_id, entity in world.items()
+                    if net_id == you or distance(entity) <= radius}
+    else:
+        relevant = world
+
+    packet = bytearray(SNAPSHOT_HEADER.pack(MSG_SNAPSHOT, tick, base_tick, you))
+    sent = dict(base)
+
+    removed = [net_id for net_id in base if net_id not in relevant]
+    _write_varint(packet, len(removed))
+    for net_id in removed:
+        _write_varint(packet, net_id)
+        del sent[net_id]
+
+    # Ближние изменения первыми: при переполнении дальние подождут следующего тика
+    changed = [(net_id, entity) for net_id, entity in relevant.items()
+               if base.get(net_id) != entity]
+    changed.sort(key=lambda item: (item[0] != you, distance(item[1])))
+
+    body = bytearray()
+    count = 0
+    budget = max_size - len(packet) - 3  # 3 байта на счётчик изменений
+    for net_id, entity in changed:
+        size = len(body)
+        _encode_entity(body, net_id, entity, base.get(net_id))
+        if len(body) > budget and count > 0:
+            del body[size:]
+            break
+        sent[net_id] = entity
+        count += 1
+
+    _write_varint(packet, count)
+    packet += body
+    return bytes(packet), sent
+
+
+def decode_snapshot(data, states):
+    """Собирает полный мир из дельты. states - тик -> мир, полученные раньше.
+    Возвращает (тик, id своего игрока, мир) или None, если базового снимка нет"""
+    message, tick, base_tick, you = SNAPSHOT_HEADER.unpack_from(data, 0)
+    if message != MSG_SNAPSHOT:
+        return None
+    if base_tick == 0:
+        world = {}
+    elif base_tick in states:
+        world = dict(states[base_tick])
+    else:
+        return None
+
+    offset = SNAPSHOT_HEADER.size
+    count, offset = _read_varint(data, offset)
+    for _ in range(count):
+        net_id, offset = _read_varint(data, offset)
+        world.pop(net_id, None)
+
+    count, offset = _read_varint(data, offset)
+    for _ in range(count):
+        net_id, offset = _read_varint(data, offset)
+        kind = data[offset]
+        mask = data[offset + 1]
+        offset += 2
+        base_entity = world.get(net_id)
+        fields = list(base_entity[1]) if base_entity and base_entity[0] == kind else None
+        if fields is None:
+            fields = [0] * _field_count(kind)
+        for i in range(len(fields)):
+            if mask & (1 << i):
+                delta, offset = _read_varint(data, offset)
+                fields[i] += _unzigzag(delta)
+        world[net_id] = (kind, tuple(fields))
+    return tick, you, world
+
+
+def _field_count(kind):
+    return {KIND_PLAYER: 5, KIND_NPC: 7, KIND_PROJECTILE: 2}[kind]
+
+
+def interpolate(older, newer, t):
+    """Мир между двумя снимками: координаты плавно, остальные поля - из старшего снимка"""
+    world = {}
+    for net_id, (kind, fields) in newer.items():
+        previous = older.get(net_id)
+        if previous is None or previous[0] != kind:
+            world[net_id] = (kind, fields)
+            continue
+        old_fields = previous[1]
+        x = old_fields[0] + (fields[0] - old_fields[0]) * t
+        y = old_fields[1] + (fields[1] - old_fields[1]) * t
+        world[net_id] = (kind, (x, y) + tuple(old_fields[2:]))
+    return world
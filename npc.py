@@ -1,12 +1,22 @@
+import itertools
+from pathlib import Path
 import pygame
-from animation import AnimationManager
+from animation import AnimationManager, shared_clock
 from settings import (NPC_BODY_COLOR, NPC_SKIN_COLOR, DIALOG_TRIGGER_DISTANCE,
                       DIALOG_TEXT_SPEED, DIALOG_BG, DIALOG_BORDER, DIALOG_TEXT,
-                      GRAVITY, USE_MASK_COLLISION)
+                      GRAVITY, USE_MASK_COLLISION, PLAYER_JUMP_POWER,
+                      NPC_SPEED, NAV_REPATH_INTERVAL, PRESENT_SCALE)
+from collision import split_subpixel
+from render import LAYER_ENTITIES
+import asset_loader
+
+# Сдвиг таймеров перестроения пути: NPC не запрашивают пути в одном кадре
+_repath_phases = itertools.count()
 
 
 class NPC(pygame.sprite.Sprite):
-    def __init__(self, x, y, assets_path=None, dialog_text=None):
+    def __init__(self, x, y, assets_path=None, dialog_text=None,
+                 behavior="idle", patrol_points=None):
         super().__init__()
 
         self.anim_manager = AnimationManager()
@@ -26,6 +36,16 @@ class NPC(pygame.sprite.Sprite):
         self.gravity = GRAVITY
         self.on_ground = False
         self.ground_buffer = 2
+        self.remainder_x = 0.0
+        self.remainder_y = 0.0
+
+        # Навигация: "idle" - стоит, "patrol" - ходит между точками, "follow" - идёт за игроком
+        self.behavior = behavior
+        self.patrol_points = list(patrol_points or [])
+        self.patrol_index = 0
+        self.path = []
+        self.repath_phase = next(_repath_phases) % NAV_REPATH_INTERVAL
+        self.repath_timer = self.repath_phase
 
         # Диалог
         self.dialog_text = dialog_text or "Привет, путник!"
@@ -42,8 +62,22 @@ class NPC(pygame.sprite.Sprite):
         self.cloud_width = 400
         self.cloud_padding = 20
 
+        # Настройки регулятора качества
+        self.cloud_render_interval = 1  # перерисовка облака раз в N напечатанных символов
+        self.offscreen_anim_interval = 1  # смена кадров за экраном раз в N тиков
+        self.on_screen = True
+
+    @staticmethod
+    def preload_assets(assets_path=None):
+        """Фоновая загрузка кадров idle до создания NPC (для экрана загрузки)"""
+        scale = 1 / PRESENT_SCALE if PRESENT_SCALE != 1 else None
+        return asset_loader.preload_directory(Path(assets_path or "assets/npc") / "idle", scale=scale)
+
     def _load_animations(self):
-        """Загружает анимации NPC"""
+        """Объявляет анимации NPC (кадры грузятся при первом play)"""
+        if PRESENT_SCALE != 1:
+            # Уменьшаем кадры под мир в родном разрешении
+            self.anim_manager.frame_scale = 1 / PRESENT_SCALE
         self.anim_manager.load_from_directory(self.assets_path, "idle", frame_duration=10, loop=True)
 
         if not self.anim_manager.animations:
@@ -77,26 +111,54 @@ class NPC(pygame.sprite.Sprite):
             self.mask = pygame.mask.from_surface(self.image)
             self.mask_offset = (0, 0)
 
-    def update(self, player, platforms):
-        """Обновляет NPC: физика + диалог"""
+    def update(self, player, platforms, navigator=None, level_mask=None, use_mask=True,
+               collision_grid=None):
+        """Обновляет NPC: навигация + физика + диалог.
+        collision_grid - соседи для проверок без маски уровня вместо перебора всех платформ"""
+        # Навигация
+        if navigator and self.behavior != "idle" and not self.dialog_active:
+            self._update_navigation(player, navigator)
+        else:
+            self.velocity_x = 0
+
+        if not use_mask:
+            level_mask = None
+
+        if self.velocity_x != 0:
+            self._move_x(platforms, level_mask, collision_grid)
+
         # Гравитация
         if not self.on_ground:
             self.velocity_y += self.gravity
 
         # Движение по Y с коллизией
         if self.velocity_y != 0 or not self.on_ground:
-            self.rect.y += self.velocity_y
+            step_y, self.remainder_y = split_subpixel(self.velocity_y, self.remainder_y)
             was_on_ground = self.on_ground
             self.on_ground = False
 
-            if USE_MASK_COLLISION:
-                self._check_collision_mask(platforms)
+            swept = None
+            if not (USE_MASK_COLLISION and use_mask) and collision_grid is not None and step_y:
+                # Шаг обрезается до первого касания: быстрое падение не проскакивает платформу
+                swept = collision_grid.sweep(self.rect, 0, step_y)
+            if swept:
+                self.rect.y += round(step_y * swept[0])
+                self.on_ground = step_y > 0
+                self.velocity_y = 0
             else:
-                self._check_collision_rect(platforms)
+                self.rect.y += step_y
+                nearby = collision_grid.query(self.rect) if collision_grid is not None else platforms
+                if USE_MASK_COLLISION and level_mask is not None:
+                    self._check_collision_level_mask(level_mask)
+                elif USE_MASK_COLLISION and use_mask:
+                    self._check_collision_mask(nearby)
+                else:
+                    self._check_collision_rect(nearby)
 
             if not was_on_ground and self.on_ground:
                 self.rect.y -= self.ground_buffer
                 self.velocity_y = 0
+                self.remainder_y = 0.0
 
         # Диалог (только когда стоим на земле)
         if self.on_ground:
@@ -111,13 +173,151 @@ class NPC(pygame.sprite.Sprite):
         if self.dialog_active:
             self._update_dialog()
 
-        # Анимация
-        self.anim_manager.update()
+        # Анимация (кадр вычисляется по общим часам, маска - только при смене кадра);
+        # за экраном кадры меняются реже
+        if not self.on_screen and shared_clock.ticks % self.offscreen_anim_interval:
+            return
         current_frame = self.anim_manager.get_current_frame()
-        if current_frame:
+        if current_frame and current_frame is not self.image:
             self.image = current_frame
             self._update_mask()
 
+    def _update_navigation(self, player, navigator):
+        """Запрашивает путь раз в NAV_REPATH_INTERVAL кадров и идёт по нему"""
+        self.repath_timer -= 1
+        if self.repath_timer <= 0 and self.on_ground:
+            self.repath_timer = NAV_REPATH_INTERVAL
+            goal = self._navigation_goal(player)
+            if goal is not None:
+                navigator.request(self, self.rect.midbottom, goal, self._set_path)
+
+        self.velocity_x = 0
+        if not self.path:
+            return
+
+        graph = navigator.graph
+        node, kind = self.path[0]
+        target_x, target_y = graph.node_position(node)
+        dx = target_x - self.rect.centerx
+
+        if abs(dx) <= NPC_SPEED and self.rect.bottom >= target_y - graph.cell_height // 2:
+            self.path.pop(0)
+            if not self.path and self.behavior == "patrol" and self.patrol_points:
+                self._next_patrol_point()
+            return
+
+        self.velocity_x = NPC_SPEED if dx > 0 else -NPC_SPEED
+        if kind == 'jump' and self.on_ground and target_y < self.rect.bottom:
+            self.velocity_y = PLAYER_JUMP_POWER
+            self.on_ground = False
+
+    def _navigation_goal(self, player):
+        if self.behavior == "follow":
+            return player.rect.midbottom
+        if self.behavior == "patrol" and self.patrol_points:
+            return self.patrol_points[self.patrol_index]
+        return None
+
+    def reset_path(self):
+        """Сбрасывает путь; новый запрос - в своей фазе, а не вместе со всеми NPC"""
+        self.path = []
+        self.repath_timer = self.repath_phase
+
+    def _set_path(self, path):
+        self.path = list(path) if path else []
+        if not path and self.behavior == "patrol" and self.patrol_points:
+            # Пустой путь - уже стоим в точке, None - до неё не дойти: идём к следующей
+            self._next_patrol_point()
+
+    def _next_patrol_point(self):
+        self.patrol_index = (self.patrol_index + 1) % len(self.patrol_points)
+        self.repath_timer = 0
+
+    def _move_x(self, platforms, level_mask=None, collision_grid=None):
+        """Горизонтальное движение с коллизией"""
+        if USE_MASK_COLLISION and level_mask is not None:
+            self._move_x_mask(level_mask)
+            return
+
+        step_x, self.remainder_x = split_subpixel(self.velocity_x, self.remainder_x)
+        blocked = False
+        if collision_grid is not None:
+            hit = collision_grid.sweep(self.rect, step_x, 0) if step_x else None
+            if hit and self._is_wall(hit[2]):
+                step_x = round(step_x * hit[0])
+                blocked = True
+        self.rect.x += step_x
+
+        nearby = collision_grid.query(self.rect) if collision_grid is not None else platforms
+        for platform in nearby:
+            if not self.rect.colliderect(platform.rect) or not self._is_wall(platform):
+                continue
+            if self.velocity_x > 0:
+                self.rect.right = platform.rect.left
+            else:
+                self.rect.left = platform.rect.right
+            blocked = True
+            break
+        if blocked:
+            self.velocity_x = 0
+            self.path = []
+
+        # Сошли с края - начинаем падать
+        if self.on_ground:
+            probe = self.rect.move(0, self.ground_buffer + 1)
+            support = collision_grid.query(probe) if collision_grid is not None else platforms
+            if not any(probe.colliderect(p.rect) for p in support):
+                self.on_ground = False
+
+    def _is_wall(self, platform):
+        # Пол под ногами (зазор ground_buffer) не считается стеной
+        return platform.rect.top < self.rect.bottom - self.ground_buffer
+
+    def _mask_position(self):
+        return (self.rect.x + self.mask_offset[0], self.rect.y + self.mask_offset[1])
+
+    def _hits_wall(self, level_mask):
+        # Пол под ногами (зазор ground_buffer) не считается стеной
+        x, y = self._mask_position()
+        return level_mask.overlap(self.mask, x, y - self.ground_buffer)
+
+    def _move_x_mask(self, level_mask):
+        """Горизонтальное движение с одним запросом к маске уровня"""
+        start_x = self.rect.x
+        step_x, self.remainder_x = split_subpixel(self.velocity_x, self.remainder_x)
+        self.rect.x += step_x
+        if self._hits_wall(level_mask):
+            direction = 1 if self.velocity_x > 0 else -1
+            while self.rect.x != start_x and self._hits_wall(level_mask):
+                self.rect.x -= direction
+            self.velocity_x = 0
+            self.path = []
+
+        # Сошли с края - начинаем падать
+        if self.on_ground:
+            x, y = self._mask_position()
+            if not level_mask.overlap(self.mask, x, y + 1):
+                self.on_ground = False
+
+    def _check_collision_level_mask(self, level_mask):
+        """Проверка коллизий одним запросом к маске уровня"""
+        x, y = self._mask_position()
+        if not level_mask.overlap(self.mask, x, y):
+            return
+
+        # Откатываемся попиксельно против направления движения
+        direction = 1 if self.velocity_y > 0 else -1
+        limit = int(abs(self.velocity_y)) + 1
+        for _ in range(limit):
+            self.rect.y -= direction
+            if not level_mask.overlap(self.mask, *self._mask_position()):
+                break
+
+        if self.velocity_y > 0:
+            self.rect.y += self.ground_buffer
+            self.on_ground = True
+        self.velocity_y = 0
+
     def _check_collision_mask(self, platforms):
         """Проверка коллизий с платформами по маске"""
         for platform in platforms:
@@ -141,8 +341,9 @@ class NPC(pygame.sprite.Sprite):
 
     def _check_collision_rect(self, platforms):
         """Проверка коллизий прямоугольниками"""
-        hits = pygame.sprite.spritecollide(self, platforms, False)
-        for platform in hits:
+        for platform in platforms:
+            if not self.rect.colliderect(platform.rect):
+                continue
             if self.velocity_y > 0:
                 self.rect.bottom = platform.rect.top
                 self.velocity_y = 0
@@ -167,7 +368,10 @@ class NPC(pygame.sprite.Sprite):
             self.current_text += self.dialog_text[self.text_index]
             self.text_index += 1
             self.text_timer = 0
-            self._render_cloud()
+            # Облако перерисовывается раз в cloud_render_interval символов и в конце текста
+            if (self.text_index % self.cloud_render_interval == 0 or
+                    self.text_index >= len(self.dialog_text)):
+                self._render_cloud()
 
         if self.text_index >= len(self.dialog_text):
             self.dialog_finished = True
@@ -236,9 +440,8 @@ class NPC(pygame.sprite.Sprite):
             self.cloud_surface.blit(text_surface, (self.cloud_padding, y_offset))
             y_offset += line_height
 
+        # Позиция облака считается при отрисовке, NPC может двигаться
         self.cloud_rect = self.cloud_surface.get_rect()
-        self.cloud_rect.centerx = self.rect.centerx
-        self.cloud_rect.bottom = self.rect.top - 10
 
     def close_dialog(self):
         """Закрывает диалог"""
@@ -250,15 +453,19 @@ class NPC(pygame.sprite.Sprite):
         """Возвращает True если NPC блокирует движение игрока"""
         return self.dialog_active and not self.dialog_finished
 
-    def draw(self, surface, camera_x, camera_y=0):
-        surface.blit(self.image, (self.rect.x - camera_x, self.rect.y - camera_y))
+    def submit(self, queue):
+        queue.submit(LAYER_ENTITIES, self.image, self.rect.x, self.rect.y)
+
+    def draw_overlay(self, surface, camera_x, camera_y=0, scale=1):
+        """Облако диалога и индикатор в экранных координатах (scale - увеличение мира)"""
+        anchor_x = (self.rect.centerx - camera_x) * scale
+        anchor_y = (self.rect.top - camera_y) * scale
 
         if self.dialog_active and self.cloud_surface:
-            if (self.cloud_rect.right - camera_x > 0 and
-                    self.cloud_rect.left - camera_x < surface.get_width()):
-                surface.blit(self.cloud_surface,
-                             (self.cloud_rect.x - camera_x,
-                              self.cloud_rect.y - camera_y))
+            self.cloud_rect.centerx = anchor_x
+            self.cloud_rect.bottom = anchor_y - 10
+            if self.cloud_rect.right > 0 and self.cloud_rect.left < surface.get_width():
+                surface.blit(self.cloud_surface, self.cloud_rect)
 
         if not self.dialog_shown and not self.dialog_active:
             distance_indicator = pygame.Surface((20, 20), pygame.SRCALPHA)
@@ -269,9 +476,7 @@ class NPC(pygame.sprite.Sprite):
             distance_indicator.blit(text, (7, 4))
 
             indicator_rect = distance_indicator.get_rect()
-            indicator_rect.centerx = self.rect.centerx
-            indicator_rect.bottom = self.rect.top - 5
+            indicator_rect.centerx = anchor_x
+            indicator_rect.bottom = anchor_y - 5
 
-            surface.blit(distance_indicator,
-                         (indicator_rect.x - camera_x,
-                          indicator_rect.y - camera_y))
\ No newline at end of file
+            surface.blit(distance_indicator, indicator_rect)
@@ -1,5 +1,10 @@
 import pygame
 import random
+from settings import WORLD_UNIT
+from render import LAYER_EFFECTS
+import surfaces
+
+_sprites = {}  # (цвет, радиус) -> заготовка круга для пакетного blit
 
 
 class Particle:
@@ -10,17 +15,22 @@ class Particle:
         self.vx, self.vy = velocity
         self.lifetime = lifetime
         self.max_lifetime = lifetime
-        self.size = random.randint(3, 6)
+        self.size = random.randint(3, 6) * WORLD_UNIT
 
     def update(self):
         self.x += self.vx
         self.y += self.vy
-        self.vy += 0.3  # гравитация частиц
+        self.vy += 0.3 * WORLD_UNIT  # гравитация частиц
         self.lifetime -= 1
-        self.size = max(1, self.size - 0.1)
+        self.size = max(1, self.size - 0.1 * WORLD_UNIT)
         return self.lifetime > 0
 
-    def draw(self, surface, camera_x, camera_y=0):
-        pygame.draw.circle(surface, self.color,
-                          (int(self.x - camera_x), int(self.y - camera_y)),
-                          int(self.size))
\ No newline at end of file
+    def submit(self, queue):
+        radius = int(self.size)
+        key = (self.color, radius)
+        image = _sprites.get(key)
+        if image is None:
+            image = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+            pygame.draw.circle(image, self.color, (radius, radius), radius)
+            image = _sprites[key] = surfaces.prepare(image)
+        queue.submit(LAYER_EFFECTS, image, int(self.x) - radius, int(self.y) - radius)
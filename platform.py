@@ -4,16 +4,21 @@ from settings import GROUND_COLOR, GRASS_COLOR, STONE_COLOR, USE_MASK_COLLISION
 
 
 class Platform(pygame.sprite.Sprite):
-    def __init__(self, x, y, width, height, tile_type='ground'):
+    def __init__(self, x, y, width, height, tile_type='ground', image=None, mask=None):
         super().__init__()
-        self.image = pygame.Surface((width, height), pygame.SRCALPHA)
-        self._draw_tile(width, height, tile_type)
+        if image is None:
+            self.image = pygame.Surface((width, height), pygame.SRCALPHA)
+            self._draw_tile(width, height, tile_type)
+        else:
+            self.image = image  # готовый тайл TMX: процедурная графика не нужна
         self.rect = self.image.get_rect(topleft=(x, y))
         self.tile_type = tile_type
+        self.layer = 0  # номер слоя TMX: порядок отрисовки пересекающихся тайлов
+        self.animation = None  # TileAnimation, общий для всех экземпляров GID
 
-        # Создаём маску для точной коллизии
+        # Создаём маску для точной коллизии (экземпляры одного тайла могут делить маску)
         if USE_MASK_COLLISION:
-            self.mask = pygame.mask.from_surface(self.image)
+            self.mask = mask if mask is not None else pygame.mask.from_surface(self.image)
 
     def _draw_tile(self, w, h, tile_type):
         """Процедурная графика для платформ"""
@@ -1,12 +1,21 @@
 import pygame
 import math
 import random
+from pathlib import Path
 from settings import (PLAYER_SPEED, PLAYER_JUMP_POWER, GRAVITY,
                       PLAYER_FRICTION, MAX_FALL_SPEED, PROJECTILE_COOLDOWN,
-                      USE_MASK_COLLISION, PLAYER_SIZE, TILE_SIZE)
+                      USE_MASK_COLLISION, PLAYER_SIZE, TILE_SIZE,
+                      PLAYER_STEP_HEIGHT, WORLD_UNIT)
 from particle import Particle
 from animation import AnimationManager
 from projectile import Projectile
+from collision import split_subpixel
+from render import LAYER_ENTITIES
+from controls import read_keyboard
+import asset_loader
+import surfaces
+
+_flipped = {}  # кадр -> его подготовленная зеркальная копия
 
 
 class Player(pygame.sprite.Sprite):
@@ -26,6 +35,8 @@ class Player(pygame.sprite.Sprite):
             self.image = pygame.Surface((self.size, self.size), pygame.SRCALPHA)
 
         self.rect = self.image.get_rect(topleft=(x, y))
+        # Маска тела: кадры анимации меняются, а хитбокс должен быть стабильным
+        self.body_mask = pygame.mask.Mask(self.rect.size, fill=True)
 
         # Физика
         self.velocity_x = 0
@@ -34,6 +45,9 @@ class Player(pygame.sprite.Sprite):
         self.jump_power = PLAYER_JUMP_POWER
         self.gravity = GRAVITY
         self.friction = PLAYER_FRICTION
+        # Дробные части смещения: в родном разрешении скорости меньше пикселя
+        self.remainder_x = 0.0
+        self.remainder_y = 0.0
 
         # Состояния
         self.on_ground = False
@@ -48,9 +62,23 @@ class Player(pygame.sprite.Sprite):
 
         # Частицы
         self.particles = []
+        self.particle_rate = 1.0  # доля создаваемых частиц (снижается регулятором качества)
+
+        # Управление: None - клавиатура, иначе PlayerInput от сервера
+        self.controls = None
+
+    @staticmethod
+    def preload_assets(assets_path=None):
+        """Фоновая загрузка кадров idle до создания игрока (для экрана загрузки);
+        остальные анимации грузятся при первом play"""
+        return asset_loader.preload_directory(Path(assets_path or "assets/player") / "idle",
+                                              size=(PLAYER_SIZE, PLAYER_SIZE))
 
     def _load_animations(self):
-        """Загружает все анимации размером с тайл"""
+        """Объявляет все анимации размером с тайл (кадры грузятся при первом play)"""
+        # Кадры масштабируются сразу при загрузке, в фоновых потоках
+        self.anim_manager.frame_size = (self.size, self.size)
+
         # ИСПРАВЛЕНО: увеличен frame_duration для более плавной анимации
         # Было: 5, Стало: 12 (idle), 10 (run), 8 (jump), 5 (attack)
         self.anim_manager.load_from_directory(self.assets_path, "idle", frame_duration=12, loop=True)
@@ -58,25 +86,11 @@ class Player(pygame.sprite.Sprite):
         self.anim_manager.load_from_directory(self.assets_path, "jump", frame_duration=8, loop=False)
         self.anim_manager.load_from_directory(self.assets_path, "attack", frame_duration=5, loop=False)
 
-        self._scale_animations()
-
         if not self.anim_manager.animations:
             self._create_placeholder_animations()
 
         self.anim_manager.play("idle")
 
-    def _scale_animations(self):
-        """Масштабирует все анимации до размера тайла"""
-        for anim_name, animation in self.anim_manager.animations.items():
-            scaled_frames = []
-            for frame in animation.frames:
-                if frame.get_size() != (self.size, self.size):
-                    scaled_frame = pygame.transform.scale(frame, (self.size, self.size))
-                    scaled_frames.append(scaled_frame)
-                else:
-                    scaled_frames.append(frame)
-            animation.frames = scaled_frames
-
     def _create_placeholder_animations(self):
         """Создаёт заглушки размером с тайл (128x128)"""
         colors = {
@@ -119,23 +133,26 @@ class Player(pygame.sprite.Sprite):
             # ИСПРАВЛЕНО: увеличен frame_duration для placeholder анимаций
             self.anim_manager.add_animation(name, frames, frame_duration=12, loop=loop)
 
-    def update(self, platforms):
-        keys = pygame.key.get_pressed()
+    def read_input(self):
+        return self.controls if self.controls is not None else read_keyboard()
+
+    def update(self, platforms, level_mask=None, collision_grid=None):
+        controls = self.read_input()
 
         # Атака
         if self.attack_cooldown > 0:
             self.attack_cooldown -= 1
 
-        if (keys[pygame.K_j] or keys[pygame.K_z] or keys[pygame.K_LCTRL]) and not self.is_attacking:
+        if controls.attack and not self.is_attacking:
             if self.attack_cooldown <= 0:
                 self._start_attack()
 
         # Движение
         if not self.is_attacking:
-            if keys[pygame.K_a] or keys[pygame.K_LEFT]:
+            if controls.left:
                 self.facing_right = False
                 self.velocity_x = -self.speed
-            elif keys[pygame.K_d] or keys[pygame.K_RIGHT]:
+            elif controls.right:
                 self.facing_right = True
                 self.velocity_x = self.speed
             else:
@@ -174,7 +191,7 @@ class Player(pygame.sprite.Sprite):
                 self.anim_manager.play(new_state)
 
         # Прыжок
-        if not self.is_attacking and (keys[pygame.K_SPACE] or keys[pygame.K_w] or keys[pygame.K_UP]) and self.on_ground:
+        if not self.is_attacking and controls.jump and self.on_ground:
             self.velocity_y = self.jump_power
             self.on_ground = False
             self._create_dust_particles()
@@ -185,10 +202,14 @@ class Player(pygame.sprite.Sprite):
             self.velocity_y += self.gravity
 
         # Коллизии
-        self._move_with_collision(platforms)
+        if USE_MASK_COLLISION and level_mask is not None:
+            self._move_with_mask(level_mask, collision_grid)
+        elif collision_grid is not None:
+            self._move_with_sweep(collision_grid)
+        else:
+            self._move_with_collision(platforms)
 
-        # Анимация
-        self.anim_manager.update()
+        # Анимация (кадр вычисляется по общим часам)
         current_frame = self.anim_manager.get_current_frame()
         if current_frame:
             self.image = current_frame
@@ -196,12 +217,12 @@ class Player(pygame.sprite.Sprite):
         # Выстрел
         if self.is_attacking and not self.attack_triggered:
             current_anim = self.anim_manager.current_animation
-            if current_anim and current_anim.current_frame == 3:
+            if current_anim and current_anim.current_frame >= 3:
                 self._fire_projectile()
                 self.attack_triggered = True
 
         # Снаряды и частицы
-        self.projectiles.update(platforms)
+        self.projectiles.update(platforms, level_mask, collision_grid)
         for p in self.particles[:]:
             if not p.update():
                 self.particles.remove(p)
@@ -217,31 +238,34 @@ class Player(pygame.sprite.Sprite):
 
     def _fire_projectile(self):
         spawn_y = self.rect.centery
-        offset_x = self.size // 2 + 10 if self.facing_right else -(self.size // 2 + 10)
+        gap = self.size // 2 + 10 * WORLD_UNIT
+        offset_x = gap if self.facing_right else -gap
         projectile = Projectile(self.rect.centerx + offset_x, spawn_y, self.facing_right)
         self.projectiles.add(projectile)
         self._create_shoot_particles()
 
     def _create_dust_particles(self):
-        for _ in range(5):
-            vx = random.uniform(-2, 2)
-            vy = random.uniform(-1, -3)
+        for _ in range(round(5 * self.particle_rate)):
+            vx = random.uniform(-2, 2) * WORLD_UNIT
+            vy = random.uniform(-1, -3) * WORLD_UNIT
             self.particles.append(Particle(self.rect.centerx, self.rect.bottom, (200, 200, 180), (vx, vy), 20))
 
     def _create_shoot_particles(self):
-        for _ in range(3):
-            vx = random.uniform(2, 5) if self.facing_right else random.uniform(-5, -2)
-            vy = random.uniform(-1, 1)
+        for _ in range(round(3 * self.particle_rate)):
+            vx = (random.uniform(2, 5) if self.facing_right else random.uniform(-5, -2)) * WORLD_UNIT
+            vy = random.uniform(-1, 1) * WORLD_UNIT
             self.particles.append(Particle(self.rect.centerx, self.rect.centery, (255, 200, 0), (vx, vy), 15))
 
     def _move_with_collision(self, platforms):
         # Движение по X
         if self.velocity_x != 0:
-            self.rect.x += self.velocity_x
+            step_x, self.remainder_x = split_subpixel(self.velocity_x, self.remainder_x)
+            self.rect.x += step_x
             self._check_collision(platforms, 'x')
 
         # Движение по Y
-        self.rect.y += self.velocity_y
+        step_y, self.remainder_y = split_subpixel(self.velocity_y, self.remainder_y)
+        self.rect.y += step_y
 
         # Сбрасываем on_ground перед проверкой
         was_on_ground = self.on_ground
@@ -249,6 +273,102 @@ class Player(pygame.sprite.Sprite):
 
         self._check_collision(platforms, 'y')
 
+    def _move_with_sweep(self, grid):
+        """Непрерывная коллизия: swept AABB находит первое касание вдоль скорости,
+        поэтому быстрые тела не проскакивают тонкие платформы"""
+        # Движение по X
+        if self.velocity_x != 0:
+            step_x, self.remainder_x = split_subpixel(self.velocity_x, self.remainder_x)
+            hit = grid.sweep(self.rect, step_x, 0) if step_x else None
+            if hit:
+                self.rect.x += round(step_x * hit[0])
+                self.velocity_x = 0
+                self.remainder_x = 0.0
+            else:
+                self.rect.x += step_x
+            self._check_collision(grid.query(self.rect), 'x')
+
+        # Движение по Y
+        step_y, self.remainder_y = split_subpixel(self.velocity_y, self.remainder_y)
+        self.on_ground = False
+
+        if step_y:
+            hit = grid.sweep(self.rect, 0, step_y)
+            if hit:
+                self.rect.y += round(step_y * hit[0])
+                self.on_ground = step_y > 0
+                self.velocity_y = 0
+                self.remainder_y = 0.0
+            else:
+                self.rect.y += step_y
+                self._check_collision(grid.query(self.rect), 'y')
+        elif self.velocity_y >= 0:
+            # Смещение меньше пикселя: проверяем опору вплотную снизу
+            hit = grid.sweep(self.rect, 0, 1)
+            if hit and hit[0] == 0:
+                self.on_ground = True
+                self.velocity_y = 0
+                self.remainder_y = 0.0
+
+    def _limit_tunneling(self, step_x, step_y, grid):
+        """Если за шаг тело целиком проскочило бы платформу, укорачивает шаг до касания
+        (плюс пиксель внутрь, чтобы маска увидела пересечение)"""
+        if grid is None or (step_x == 0 and step_y == 0):
+            return step_x, step_y
+        hit = grid.sweep(self.rect, step_x, step_y)
+        if hit is None or self.rect.move(step_x, step_y).colliderect(hit[2].rect):
+            return step_x, step_y
+        toi = hit[0]
+        return (round(step_x * toi) + (step_x > 0) - (step_x < 0),
+                round(step_y * toi) + (step_y > 0) - (step_y < 0))
+
+    def _move_with_mask(self, level_mask, grid=None):
+        """Попиксельная коллизия одним запросом к маске уровня"""
+        # Движение по X с подъёмом на ступеньки и склоны
+        if self.velocity_x != 0:
+            start_x = self.rect.x
+            step_x, self.remainder_x = split_subpixel(self.velocity_x, self.remainder_x)
+            step_x, _ = self._limit_tunneling(step_x, 0, grid)
+            self.rect.x += step_x
+            if level_mask.overlap(self.body_mask, self.rect.x, self.rect.y):
+                stepped = False
+                if self.on_ground:
+                    for step in range(1, PLAYER_STEP_HEIGHT + 1):
+                        if not level_mask.overlap(self.body_mask, self.rect.x, self.rect.y - step):
+                            self.rect.y -= step
+                            stepped = True
+                            break
+                if not stepped:
+                    direction = 1 if self.velocity_x > 0 else -1
+                    while self.rect.x != start_x and level_mask.overlap(
+                            self.body_mask, self.rect.x, self.rect.y):
+                        self.rect.x -= direction
+                    self.velocity_x = 0
+                    self.remainder_x = 0.0
+
+        # Движение по Y
+        start_y = self.rect.y
+        step_y, self.remainder_y = split_subpixel(self.velocity_y, self.remainder_y)
+        _, step_y = self._limit_tunneling(0, step_y, grid)
+        self.rect.y += step_y
+        self.on_ground = False
+
+        if level_mask.overlap(self.body_mask, self.rect.x, self.rect.y):
+            direction = 1 if self.rect.y >= start_y else -1
+            while self.rect.y != start_y and level_mask.overlap(
+                    self.body_mask, self.rect.x, self.rect.y):
+                self.rect.y -= direction
+            if direction > 0:
+                self.on_ground = True
+            self.velocity_y = 0
+            self.remainder_y = 0.0
+        elif self.velocity_y >= 0 and level_mask.overlap(
+                self.body_mask, self.rect.x, self.rect.y + 1):
+            # Стоим вплотную к земле
+            self.on_ground = True
+            self.velocity_y = 0
+            self.remainder_y = 0.0
+
     def _check_collision(self, platforms, direction):
         """Упрощённая проверка коллизий с использованием rect"""
         for platform in platforms:
@@ -279,16 +399,21 @@ class Player(pygame.sprite.Sprite):
                         self.velocity_y = 0
                         return
 
-    def draw(self, surface, camera_x, camera_y=0):
-        # Отражаем спрайт если смотрим влево
-        if not self.facing_right:
-            flipped_image = pygame.transform.flip(self.image, True, False)
-            surface.blit(flipped_image, (self.rect.x - camera_x, self.rect.y - camera_y))
-        else:
-            surface.blit(self.image, (self.rect.x - camera_x, self.rect.y - camera_y))
+    def _flipped_image(self):
+        """Отражение текущего кадра: делается и готовится к blit один раз на кадр анимации"""
+        image = _flipped.get(self.image)
+        if image is None:
+            image = _flipped[self.image] = surfaces.prepare(
+                pygame.transform.flip(self.image, True, False))
+        return image
+
+    def submit(self, queue):
+        """Ставит игрока, снаряды и частицы в очередь рисования"""
+        image = self.image if self.facing_right else self._flipped_image()
+        queue.submit(LAYER_ENTITIES, image, self.rect.x, self.rect.y, 1)
 
         for projectile in self.projectiles:
-            projectile.draw(surface, camera_x, camera_y)
+            projectile.submit(queue)
 
         for particle in self.particles:
-            particle.draw(surface, camera_x, camera_y)
\ No newline at end of file
+            particle.submit(queue)
\ No newline at end of file
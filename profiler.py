@@ -0,0 +1,172 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from settings import (PROFILE_ENV_VAR, PROFILE_DEFAULT_FRAMES, PROFILE_SAMPLE_INTERVAL,
+                      PROFILE_OUTPUT_DIR, PROFILE_REPORT_LINES)
+
+
+def frames_from_env():
+    """Число кадров из переменной окружения (PG_PROFILE_FRAMES=300) или None"""
+    value = os.environ.get(PROFILE_ENV_VAR)
+    if not value:
+        return None
+    try:
+        return max(1, int(value))
+    except ValueError:
+        return PROFILE_DEFAULT_FRAMES
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class ProfileCapture:
+    """Запись профиля за ограниченное окно кадров.
+    cProfile даёт точную статистику по функциям для каждой фазы кадра,
+    поток-сэмплер снимает стеки главного потока для flame graph.
+    Пока захват не создан, игра его не вызывает - накладных расходов нет"""
+
+    def __init__(self, frames=PROFILE_DEFAULT_FRAMES, sample_interval=PROFILE_SAMPLE_INTERVAL,
+                 output_dir=PROFILE_OUTPUT_DIR):
+        self.frames = frames
+        self.frame = 0
+        self.sample_interval = sample_interval
+        self.output_dir = output_dir
+        self.profiles = {}  # фаза -> cProfile.Profile
+        self.phase_times = defaultdict(list)  # фаза -> секунды по кадрам
+        self.stacks = Counter()  # "фаза;функция;...;функция" -> число сэмплов
+        self._phase = None
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+        self._sampler.start()
+        print(f"Профилирование {frames} кадров...")
+
+    @property
+    def finished(self):
+        return self.frame >= self.frames
+
+    @contextmanager
+    def phase(self, name):
+        """Профилирует одну фазу кадра (update, draw, ...)"""
+        profile = self.profiles.get(name)
+        if profile is None:
+            profile = self.profiles[name] = cProfile.Profile()
+        self._phase = name
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.phase_times[name].append(time.perf_counter() - started)
+            self._phase = None
+
+    def end_frame(self):
+        """Отмечает конец кадра. True - окно кончилось, пора вызвать stop()"""
+        self.frame += 1
+        return self.finished
+
+    def _sample(self):
+        while not self._stop.wait(self.sample_interval):
+            phase = self._phase
+            if phase is None:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            # Внешние кадры (main, цикл, contextmanager) одинаковы - корень стека в фазе
+            stack.reverse()
+            self.stacks[";".join([phase] + stack)] += 1
+
+    def stop(self):
+        """Останавливает сэмплер и пишет отчёт, flame graph и .prof по фазам"""
+        self._stop.set()
+        self._sampler.join()
+        os.makedirs(self.output_dir, exist_ok=True)
+        prefix = os.path.join(self.output_dir, time.strftime("profile-%Y%m%d-%H%M%S"))
+
+        report_path = prefix + ".txt"
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(self.format())
+
+        # Свёрнутые стеки: открываются speedscope, flamegraph.pl, inferno
+        folded_path = prefix + ".folded"
+        with open(folded_path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        paths = [report_path, folded_path]
+        for name, profile in self.profiles.items():
+            path = f"{prefix}-{name}.prof"
+            profile.dump_stats(path)
+            paths.append(path)
+        print("Профиль записан: " + ", ".join(paths))
+        return paths
+
+    def format(self):
+        lines = [f"Профиль: {self.frame} кадров, {sum(self.stacks.values())} сэмплов "
+                 f"(интервал {self.sample_interval * 1000:.1f} мс)"]
+        for name, times in self.phase_times.items():
+            ms = sorted(t * 1000 for t in times)
+            lines.append(f"  {name:<10} среднее {sum(ms) / len(ms):7.2f} мс  "
+                         f"p95 {ms[min(len(ms) - 1, int(len(ms) * 0.95))]:7.2f} мс  "
+                         f"макс {ms[-1]:7.2f} мс")
+
+        for name, profile in self.profiles.items():
+            stream = io.StringIO()
+            stats = pstats.Stats(profile, stream=stream)
+            stats.sort_stats("tottime").print_stats(PROFILE_REPORT_LINES)
+            lines.append(f"\n=== {name}: функции по собственному времени ===")
+            lines.append(stream.getvalue().strip())
+
+        lines.append("\n=== Горячие пути (сэмплы) ===")
+        total = max(1, sum(self.stacks.values()))
+        for stack, count in self.stacks.most_common(PROFILE_REPORT_LINES):
+            frames = stack.split(";")
+            path = " > ".join([frames[0]] + frames[-4:]) if len(frames) > 5 else " > ".join(frames)
+            lines.append(f"{count / total * 100:5.1f}%  {path}")
+        return "\n".join(lines) + "\n"
+
+
+def main():
+    """Профиль симуляции без окна: python profiler.py [кадров] [путь к карте]"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from settings import SCREEN_WIDTH, SCREEN_HEIGHT
+    from startup import init_pygame
+    from controls import NO_INPUT
+    from game import Game
+
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else PROFILE_DEFAULT_FRAMES
+    map_path = sys.argv[2] if len(sys.argv) > 2 else None
+
+    init_pygame()
+    pygame.display.set_mode((1, 1))
+    game = Game(map_path=map_path)
+    game.player.controls = NO_INPUT
+    surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    clock = pygame.time.Clock()
+
+    capture = ProfileCapture(frames)
+    while not capture.finished:
+        with capture.phase("update"):
+            game.update()
+        with capture.phase("draw"):
+            game.draw(surface, clock)
+        capture.end_frame()
+    print(capture.format())
+    capture.stop()
+
+
+if __name__ == "__main__":
+    main()
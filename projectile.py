@@ -1,29 +1,60 @@
 import pygame
-from settings import PROJECTILE_COLOR, PROJECTILE_SPEED, PROJECTILE_LIFETIME
+from settings import (PROJECTILE_COLOR, PROJECTILE_SPEED, PROJECTILE_LIFETIME,
+                      USE_MASK_COLLISION, WORLD_UNIT)
+from render import LAYER_ENTITIES
+import surfaces
+
+_sprites = {}  # (ширина, высота) -> (картинка, маска), общие для всех снарядов
 
 
 class Projectile(pygame.sprite.Sprite):
     def __init__(self, x, y, direction_right):
         super().__init__()
-        self.image = pygame.Surface((16, 8), pygame.SRCALPHA)
-        self._draw_projectile()
+        width = max(2, round(16 * WORLD_UNIT))
+        height = max(1, round(8 * WORLD_UNIT))
+        sprite = _sprites.get((width, height))
+        if sprite is None:
+            # Все снаряды одного размера делят подготовленную картинку и маску
+            image = pygame.Surface((width, height), pygame.SRCALPHA)
+            self._draw_projectile(image, width, height)
+            image = surfaces.prepare(image)
+            sprite = _sprites[(width, height)] = (image, pygame.mask.from_surface(image))
+        self.image, self.mask = sprite
         self.rect = self.image.get_rect(center=(x, y))
+        self.x = float(self.rect.x)  # точная позиция: скорость может быть дробной
         self.velocity_x = PROJECTILE_SPEED if direction_right else -PROJECTILE_SPEED
         self.lifetime = PROJECTILE_LIFETIME
 
-    def _draw_projectile(self):
+    @staticmethod
+    def _draw_projectile(image, width, height):
         """Рисует снаряд (можно заменить на спрайт)"""
-        pygame.draw.ellipse(self.image, PROJECTILE_COLOR, (0, 0, 16, 8))
-        pygame.draw.ellipse(self.image, (255, 200, 0), (2, 2, 12, 4))
+        pygame.draw.ellipse(image, PROJECTILE_COLOR, (0, 0, width, height))
+        if width > 4 and height > 4:
+            pygame.draw.ellipse(image, (255, 200, 0), (2, 2, width - 4, height - 4))
 
-    def update(self, platforms):
-        self.rect.x += self.velocity_x
+    def update(self, platforms, level_mask=None, collision_grid=None):
         self.lifetime -= 1
 
+        self.x += self.velocity_x
+        step = int(self.x) - self.rect.x
+        if collision_grid is not None and step:
+            # Swept AABB только укорачивает шаг: тонкую платформу снаряд не проскочит
+            # на любой скорости, а попадание решает маска или прямоугольники ниже
+            hit = collision_grid.sweep(self.rect, step, 0)
+            if hit is not None and not self.rect.move(step, 0).colliderect(hit[2].rect):
+                step = round(step * hit[0]) + (1 if step > 0 else -1)
+                self.x = float(self.rect.x + step)
+        self.rect.x += step
+
         # Проверка столкновения с платформами
-        hits = pygame.sprite.spritecollide(self, platforms, False)
+        if USE_MASK_COLLISION and level_mask is not None:
+            hits = level_mask.overlap(self.mask, self.rect.x, self.rect.y)
+        elif collision_grid is not None:
+            hits = any(self.rect.colliderect(p.rect) for p in collision_grid.query(self.rect))
+        else:
+            hits = pygame.sprite.spritecollide(self, platforms, False)
         if hits or self.lifetime <= 0:
             self.kill()
 
-    def draw(self, surface, camera_x, camera_y=0):
-        surface.blit(self.image, (self.rect.x - camera_x, self.rect.y - camera_y))
\ No newline at end of file
+    def submit(self, queue):
+        queue.submit(LAYER_ENTITIES, self.image, self.rect.x, self.rect.y, 2)
\ No newline at end of file
@@ -0,0 +1,59 @@
+from collections import deque, namedtuple
+from settings import (FPS, QUALITY_WINDOW, QUALITY_DEGRADE_RATIO, QUALITY_RECOVER_RATIO,
+                      QUALITY_COOLDOWN)
+
+QualityLevel = namedtuple("QualityLevel", [
+    "name",
+    "particle_rate",             # доля создаваемых частиц
+    "cloud_count",               # облаков на фоне
+    "gradient",                  # градиентное небо или заливка одним цветом
+    "dialog_render_interval",    # перерисовка облака диалога раз в N символов
+    "offscreen_anim_interval",   # смена кадров у NPC за экраном раз в N тиков
+    "mask_collision",            # попиксельная коллизия или прямоугольники
+])
+
+# От лучшего к худшему
+QUALITY_LEVELS = (
+    QualityLevel("high", 1.0, 5, True, 1, 1, True),
+    QualityLevel("medium", 0.6, 3, True, 2, 4, True),
+    QualityLevel("low", 0.3, 1, True, 4, 8, False),
+    QualityLevel("minimal", 0.0, 0, False, 8, 16, False),
+)
+
+
+class QualityGovernor:
+    """Следит за временем кадров и переключает уровни качества, чтобы держать бюджет FPS"""
+
+    def __init__(self, target_fps=FPS, window=QUALITY_WINDOW):
+        self.budget_ms = 1000 / target_fps
+        self.frame_times = deque(maxlen=window)
+        self.index = 0
+        self.cooldown = 0
+        self.changed = False  # True на кадре, когда уровень сменился
+
+    @property
+    def level(self):
+        return QUALITY_LEVELS[self.index]
+
+    def observe(self, frame_ms):
+        """Принимает время работы кадра (clock.get_rawtime(), без ожидания tick)"""
+        self.changed = False
+        self.frame_times.append(frame_ms)
+        if self.cooldown > 0:
+            self.cooldown -= 1
+            return
+        if len(self.frame_times) < self.frame_times.maxlen:
+            return
+
+        average = sum(self.frame_times) / len(self.frame_times)
+        if average > self.budget_ms * QUALITY_DEGRADE_RATIO and self.index < len(QUALITY_LEVELS) - 1:
+            self._set_index(self.index + 1)
+        elif average < self.budget_ms * QUALITY_RECOVER_RATIO and self.index > 0:
+            self._set_index(self.index - 1)
+
+    def _set_index(self, index):
+        self.index = index
+        self.changed = True
+        self.cooldown = QUALITY_COOLDOWN
+        self.frame_times.clear()  # оцениваем новый уровень с чистого окна
+        print(f"Качество: {self.level.name}")
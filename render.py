@@ -0,0 +1,80 @@
+# Слои рисуются по возрастанию номера
+LAYER_BACKGROUND = 0
+LAYER_TILES = 1
+LAYER_ENTITIES = 2
+LAYER_EFFECTS = 3
+
+
+class RenderStats:
+    """Счётчики последнего кадра"""
+
+    def __init__(self):
+        self.submitted = 0
+        self.culled = 0
+        self.drawn = 0
+        self.batches = 0
+
+    def reset(self):
+        self.submitted = self.culled = self.drawn = self.batches = 0
+
+
+class RenderQueue:
+    """Собирает команды рисования по слоям, отсекает невидимые
+    и отправляет каждый слой одним вызовом Surface.blits"""
+
+    def __init__(self):
+        self.layers = {}  # слой -> [(z, порядок, поверхность, x, y)]
+        self.stats = RenderStats()
+        self._order = 0
+
+    def clear(self):
+        for commands in self.layers.values():
+            commands.clear()
+        self._order = 0
+
+    def submit(self, layer, image, x, y, z=0):
+        """Добавляет картинку в мировых координатах. z - порядок внутри слоя"""
+        commands = self.layers.get(layer)
+        if commands is None:
+            commands = self.layers[layer] = []
+        commands.append((z, self._order, image, x, y))
+        self._order += 1
+        self.stats.submitted += 1
+
+    def flush(self, surface, camera_x, camera_y):
+        """Рисует всё накопленное на surface со сдвигом камеры и очищает очередь"""
+        view_width, view_height = surface.get_size()
+        camera_x = int(camera_x)
+        camera_y = int(camera_y)
+        stats = self.stats
+
+        for layer in sorted(self.layers):
+            commands = self.layers[layer]
+            if not commands:
+                continue
+            commands.sort(key=_draw_order)
+
+            batch = []
+            for _, _, image, x, y in commands:
+                screen_x = int(x) - camera_x
+                screen_y = int(y) - camera_y
+                width, height = image.get_size()
+                if (screen_x >= view_width or screen_y >= view_height
+                        or screen_x + width <= 0 or screen_y + height <= 0):
+                    stats.culled += 1
+                    continue
+                batch.append((image, (screen_x, screen_y)))
+
+            if batch:
+                surface.blits(batch, False)
+                stats.drawn += len(batch)
+                stats.batches += 1
+
+        self.clear()
+
+    def begin_frame(self):
+        self.stats.reset()
+
+
+def _draw_order(command):
+    return command[0], command[1]
@@ -0,0 +1,191 @@
+import os
+import socket
+import sys
+import time
+import pygame
+from settings import (NET_HOST, NET_PORT, NET_TICK_RATE, NET_HISTORY, NET_CLIENT_TIMEOUT,
+                      NET_STATS_INTERVAL)
+from controls import NO_INPUT, unpack_input
+from net import (MSG_INPUT, MSG_BYE, INPUT, EntityIds, capture_world, encode_snapshot)
+
+
+class ClientSlot:
+    """Состояние одного клиента на сервере"""
+
+    def __init__(self, player, tick):
+        self.player = player
+        self.acked_tick = 0
+        self.sent = {}  # тик -> мир, каким его увидит клиент после этого снимка
+        self.last_seen = tick
+        self.bytes_sent = 0
+
+
+class Server:
+    """Авторитетная симуляция без окна: принимает кнопки клиентов по UDP
+    и каждый тик рассылает дельта-снимки относительно подтверждённых"""
+
+    def __init__(self, game, host=NET_HOST, port=NET_PORT, capture=None):
+        self.game = game
+        self.capture = capture  # ProfileCapture на время записи профиля
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.socket.setblocking(False)
+        self.clients = {}  # адрес -> ClientSlot
+        self.ids = EntityIds()
+        self.tick = 0
+        # Основной игрок уровня ждёт первого клиента и не читает клавиатуру сервера
+        game.player.controls = NO_INPUT
+
+        # Статистика за текущий интервал
+        self.stats_ticks = 0
+        self.stats_time = 0.0
+        self.stats_bytes = 0
+        self.stats_started = time.perf_counter()
+
+    @property
+    def address(self):
+        return self.socket.getsockname()
+
+    def _receive(self):
+        while True:
+            try:
+                data, address = self.socket.recvfrom(64)
+            except (BlockingIOError, ConnectionResetError):
+                return
+            if not data:
+                continue
+            if data[0] == MSG_BYE:
+                self._disconnect(address)
+            elif data[0] == MSG_INPUT and len(data) >= INPUT.size:
+                _, ack, buttons = INPUT.unpack_from(data)
+                client = self.clients.get(address) or self._connect(address)
+                client.last_seen = self.tick
+                client.player.controls = unpack_input(buttons)
+                if ack > client.acked_tick and ack in client.sent:
+                    client.acked_tick = ack
+                    # Старее подтверждённого снимка базы уже не понадобятся
+                    for tick in [t for t in client.sent if t < ack]:
+                        del client.sent[tick]
+
+    def _connect(self, address):
+        taken = {client.player for client in self.clients.values()}
+        player = self.game.player if self.game.player not in taken else self.game.add_player()
+        client = ClientSlot(player, self.tick)
+        self.clients[address] = client
+        print(f"Клиент подключился: {address[0]}:{address[1]}")
+        return client
+
+    def _disconnect(self, address):
+        client = self.clients.pop(address, None)
+        if client is None:
+            return
+        if client.player is self.game.player:
+            client.player.controls = NO_INPUT
+        else:
+            self.game.remove_player(client.player)
+        print(f"Клиент отключился: {address[0]}:{address[1]}")
+
+    def step(self):
+        """Один тик: входы, симуляция, рассылка снимков"""
+        started = time.perf_counter()
+        self._receive()
+        if self.capture is None:
+            self.game.update()
+        else:
+            with self.capture.phase("update"):
+                self.game.update()
+        self.tick += 1
+
+        if self.capture is None:
+            self._broadcast()
+        else:
+            with self.capture.phase("broadcast"):
+                self._broadcast()
+            if self.capture.end_frame():
+                self.capture.stop()
+                self.capture = None
+
+        self.stats_ticks += 1
+        self.stats_time += time.perf_counter() - started
+
+    def _broadcast(self):
+        world = capture_world(self.game, self.ids)
+        for address, client in list(self.clients.items()):
+            if self.tick - client.last_seen > NET_CLIENT_TIMEOUT:
+                self._disconnect(address)
+                continue
+            self._send(address, client, world)
+
+    def _send(self, address, client, world):
+        base_tick = client.acked_tick if client.acked_tick in client.sent else 0
+        base = client.sent.get(base_tick, {})
+        packet, sent = encode_snapshot(self.tick, base_tick, base, world,
+                                       self.ids.get(client.player))
+        client.sent[self.tick] = sent
+        # Клиент давно не подтверждает - держим историю ограниченной
+        while len(client.sent) > NET_HISTORY:
+            del client.sent[min(client.sent)]
+        try:
+            self.socket.sendto(packet, address)
+        except OSError:
+            return
+        client.bytes_sent += len(packet)
+        self.stats_bytes += len(packet)
+
+    def take_stats(self):
+        """Статистика с прошлого вызова: (мс на тик, байт в секунду на клиента, сущностей)"""
+        elapsed = max(time.perf_counter() - self.stats_started, 1e-6)
+        tick_ms = self.stats_time / self.stats_ticks * 1000 if self.stats_ticks else 0.0
+        per_client = self.stats_bytes / elapsed / max(1, len(self.clients))
+        entities = len(capture_world(self.game, self.ids))
+        self.stats_ticks = 0
+        self.stats_time = 0.0
+        self.stats_bytes = 0
+        self.stats_started = time.perf_counter()
+        return tick_ms, per_client, entities
+
+    def run(self):
+        """Фиксированный шаг: тики не зависят от времени рассылки"""
+        tick_length = 1 / NET_TICK_RATE
+        next_tick = time.perf_counter()
+        next_stats = next_tick + NET_STATS_INTERVAL
+        print(f"Сервер запущен на {self.address[0]}:{self.address[1]}, {NET_TICK_RATE} тиков/с")
+        try:
+            while True:
+                now = time.perf_counter()
+                if now < next_tick:
+                    time.sleep(next_tick - now)
+                    continue
+                self.step()
+                next_tick += tick_length
+                if now - next_tick > 1:
+                    next_tick = now  # сильно отстали - не догоняем пачкой тиков
+
+                if now >= next_stats:
+                    tick_ms, per_client, entities = self.take_stats()
+                    print(f"Сервер: клиентов {len(self.clients)}, сущностей {entities}, "
+                          f"тик {tick_ms:.2f} мс, {per_client / 1024:.1f} КБ/с на клиента")
+                    next_stats = now + NET_STATS_INTERVAL
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.socket.close()
+
+
+def main():
+    """Запуск без окна: python server.py [путь к карте]"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    from startup import init_pygame
+    from game import Game
+    from profiler import ProfileCapture, frames_from_env
+
+    init_pygame()
+    pygame.display.set_mode((1, 1))  # нужен для convert_alpha при загрузке кадров
+    map_path = sys.argv[1] if len(sys.argv) > 1 else None
+    capture_frames = frames_from_env()
+    capture = ProfileCapture(capture_frames) if capture_frames else None
+    Server(Game(map_path=map_path), capture=capture).run()
+
+
+if __name__ == "__main__":
+    main()
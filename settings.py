@@ -1,8 +1,5 @@
-import pygame
 import os
 
-pygame.init()
-
 SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 720
 FPS = 60
@@ -10,9 +7,18 @@ FPS = 60
 # Масштаб тайлов (карта имеет тайлы 16x16, масштабируем до 128x128)
 TILE_SCALE = 6.0
 
+# Рендер в родном разрешении: тайлы, спрайты и маски остаются 16x16,
+# мир рисуется в маленькую поверхность и один раз за кадр растягивается на экран
+NATIVE_RESOLUTION = False
+PRESENT_SCALE = int(TILE_SCALE) if NATIVE_RESOLUTION else 1  # Увеличение кадра при выводе
+WORLD_SCALE = TILE_SCALE / PRESENT_SCALE  # Масштаб тайлов внутри мира (6.0 или 1.0)
+WORLD_UNIT = 1 / PRESENT_SCALE  # Один экранный пиксель в единицах мира
+VIEW_WIDTH = SCREEN_WIDTH // PRESENT_SCALE  # Видимая часть мира в единицах мира
+VIEW_HEIGHT = SCREEN_HEIGHT // PRESENT_SCALE
+
 # Размеры
 ORIGINAL_TILE_SIZE = 16  # Исходный размер тайла в карте Tiled
-TILE_SIZE = int(ORIGINAL_TILE_SIZE * TILE_SCALE)  # 128 пикселей (16 * 8)
+TILE_SIZE = int(ORIGINAL_TILE_SIZE * WORLD_SCALE)  # 128 пикселей (16 * 8)
 PLAYER_SIZE = TILE_SIZE  # Игрок равен размеру тайла (128x128)
 
 # Настройки камеры
@@ -20,6 +26,9 @@ CAMERA_SMOOTH = 0.1
 
 # Настройки коллизии
 USE_MASK_COLLISION = True
+COLLISION_GRID_CELL_TILES = 4  # Размер ячейки сетки для swept AABB (в тайлах)
+PLAYER_STEP_HEIGHT = max(1, int(8 * WORLD_UNIT))  # На сколько пикселей игрок поднимается по склону за шаг
+LEVEL_MASK_STRIPE_WIDTH = 2048  # Маска уровня режется на вертикальные полосы такой ширины (пикселей)
 
 # Цвета
 SKY_BLUE = (135, 206, 235)
@@ -38,26 +47,93 @@ DIALOG_BORDER = (100, 100, 100)
 DIALOG_TEXT = (0, 0, 0)
 
 # Настройки диалогов (ДОБАВЛЕНЫ - исправляют ImportError)
-DIALOG_TRIGGER_DISTANCE = 150  # Расстояние для активации диалога
+DIALOG_TRIGGER_DISTANCE = 150 * WORLD_UNIT  # Расстояние для активации диалога
 DIALOG_TEXT_SPEED = 2          # Скорость печатания текста (кадров на символ)
 DIALOG_COOLDOWN = 500          # Задержка между диалогами (мс)
 
-# Физика
-GRAVITY = 0.6
-PLAYER_SPEED = 5
-PLAYER_JUMP_POWER = -15
+# Физика (в единицах мира: в родном разрешении скорости делятся на PRESENT_SCALE)
+GRAVITY = 0.6 * WORLD_UNIT
+PLAYER_SPEED = 5 * WORLD_UNIT
+PLAYER_JUMP_POWER = -15 * WORLD_UNIT
 PLAYER_FRICTION = 0.8
-MAX_FALL_SPEED = 20
+MAX_FALL_SPEED = 20 * WORLD_UNIT
 
 # Атака
-PROJECTILE_SPEED = 10
+PROJECTILE_SPEED = 10 * WORLD_UNIT
 PROJECTILE_COOLDOWN = 15
 PROJECTILE_LIFETIME = 120
 
+# Навигация NPC
+NAV_PATH_CACHE_SIZE = 256      # Сколько последних путей хранить в LRU-кэше
+NAV_SEARCH_BUDGET_MS = 1.5     # Время на поиск путей за кадр (мс), длинный A* делится на кадры
+NAV_EXPANSIONS_PER_STEP = 32   # Раскрытых узлов A* между проверками времени
+NAV_REPATH_INTERVAL = 30       # Как часто NPC перестраивает путь (кадров)
+NPC_SPEED = 3 * WORLD_UNIT
+
+# Адаптивное качество
+QUALITY_WINDOW = 60             # Окно усреднения времени кадра (кадров)
+QUALITY_DEGRADE_RATIO = 0.9     # Понижаем качество, если работа кадра > 90% бюджета
+QUALITY_RECOVER_RATIO = 0.5     # Повышаем, если < 50% бюджета
+QUALITY_COOLDOWN = 120          # Минимум кадров между переключениями
+
+# Снимки состояния (перемотка и мгновенный рестарт)
+SNAPSHOT_INTERVAL = 1           # Снимок каждые N тиков
+SNAPSHOT_HISTORY = 600          # Размер кольцевого буфера (600 тиков = 10 секунд)
+SNAPSHOT_MAX_PROJECTILES = 32   # Сколько снарядов помещается в снимок
+SNAPSHOT_MAX_PARTICLES = 128    # Сколько частиц помещается в снимок
+
+# Сеть (сервер и клиенты на localhost)
+NET_HOST = "127.0.0.1"
+NET_PORT = 47000
+NET_TICK_RATE = FPS             # Тиков симуляции в секунду на сервере
+NET_MAX_PACKET = 1200           # Предел размера снимка (байт), лишние изменения ждут следующего тика
+NET_HISTORY = 64                # Сколько отправленных снимков помнить для дельт
+NET_INTERP_DELAY = 3            # Клиент рисует мир на столько тиков в прошлом
+NET_CLIENT_TIMEOUT = 180        # Клиент отключается после стольких тиков тишины
+NET_POSITION_QUANTUM = 1.0      # Шаг квантования координат (пиксели мира)
+NET_RELEVANCE_RADIUS = 1600 * WORLD_UNIT  # Дальше этого от игрока сущности не отправляются
+NET_STATS_INTERVAL = 5          # Как часто сервер печатает статистику (секунды)
+
+# Горячая перезагрузка карты
+HOT_RELOAD = True               # Следить за map.tmx и тайлсетами и применять правки на лету
+HOT_RELOAD_POLL_FRAMES = 30     # Как часто проверять файлы (кадров)
+
 # Пути
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ASSETS_DIR = os.path.join(BASE_DIR, "assets")
 MAPS_DIR = os.path.join(ASSETS_DIR, "maps")
 DEFAULT_MAP = os.path.join(MAPS_DIR, "map.tmx")
 PLAYER_ASSETS_DIR = os.path.join(ASSETS_DIR, "player")
-NPC_ASSETS_DIR = os.path.join(ASSETS_DIR, "npc")
\ No newline at end of file
+NPC_ASSETS_DIR = os.path.join(ASSETS_DIR, "npc")
+ASSET_LOADER_WORKERS = min(8, os.cpu_count() or 4)  # Потоки для декодирования картинок
+STARTUP_REPORT_PATH = os.path.join(BASE_DIR, "startup_profile.jsonl")
+MEMORY_SNAPSHOT_PATH = os.path.join(BASE_DIR, "memory_snapshots.jsonl")
+
+# Бенчмарки
+BENCHMARK_FRAMES = 120           # Замеряемых кадров на сценарий
+BENCHMARK_WARMUP = 10            # Кадров прогрева (не учитываются)
+BENCHMARK_RESULTS_PATH = os.path.join(BASE_DIR, "benchmark_results.jsonl")
+# Регрессии ищутся относительно прошлых прогонов на этой же машине
+BENCHMARK_BASELINE_RUNS = 5           # Сколько последних прогонов составляют базу
+BENCHMARK_BASELINE_MIN_RUNS = 3       # Меньше прогонов - сравнение не делается
+BENCHMARK_REGRESSION_RATIO = 0.25     # Допустимый рост относительно медианы базы
+BENCHMARK_NOISE_SIGMAS = 3            # Плюс столько разбросов (MAD) прошлых прогонов
+BENCHMARK_BLIT_REPEATS = 50      # Проходов при замере стоимости blit по классам поверхностей
+BENCHMARK_BLIT_SURFACES = 64     # Сколько поверхностей каждого класса замерять
+
+# Профилирование по запросу (F10 или PG_PROFILE_FRAMES=N)
+PROFILE_ENV_VAR = "PG_PROFILE_FRAMES"
+PROFILE_DEFAULT_FRAMES = 300       # Длина окна захвата (кадров)
+PROFILE_SAMPLE_INTERVAL = 0.001    # Период сэмплирования стеков для flame graph (секунды)
+PROFILE_REPORT_LINES = 25          # Строк в каждой таблице отчёта
+PROFILE_OUTPUT_DIR = os.path.join(BASE_DIR, "profiles")
+
+# Несколько уровней: LRU-кэш построенных уровней и фоновая подготовка следующего
+LEVEL_CACHE_SIZE = 3                # Сколько неактивных уровней держать в памяти
+LEVEL_BUILD_CHUNK = 64              # Тайлов (или клеток навигации) за один шаг фоновой сборки
+LEVEL_PREBUILD_BUDGET_MS = 4        # Время на фоновую сборку за кадр (мс)
+LEVEL_PREBUILD_DISTANCE = 800 * WORLD_UNIT  # С какого расстояния до выхода начинать сборку
+
+# Подготовка поверхностей к blit (тайлы, кадры анимаций, снаряды, частицы)
+SURFACE_COLORKEY = (255, 0, 255)     # Ключевой цвет для спрайтов без полупрозрачности
+SURFACE_RLE_MIN_RUN_FRACTION = 0.5   # RLEACCEL, если прозрачных и непрозрачных пикселей не меньше доли
\ No newline at end of file
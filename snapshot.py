@@ -0,0 +1,214 @@
+import random
+import struct
+from animation import shared_clock
+from particle import Particle
+from projectile import Projectile
+from settings import (SNAPSHOT_INTERVAL, SNAPSHOT_HISTORY, SNAPSHOT_MAX_PROJECTILES,
+                      SNAPSHOT_MAX_PARTICLES)
+
+# Компактные записи фиксированного размера (little-endian, без выравнивания)
+HEADER = struct.Struct("<IIffHH")  # тик часов, сид ГСЧ, камера x/y, число снарядов/частиц
+PLAYER = struct.Struct("<iiffffBBBBBBhI")
+NPC = struct.Struct("<iiffffBBBBBHHhI")
+PROJECTILE = struct.Struct("<fifh")
+PARTICLE = struct.Struct("<ffffhhfBBB")
+
+PLAYER_STATES = ("idle", "run", "jump", "attack")
+NO_ANIMATION = 255
+
+
+def _animation_names(anim_manager):
+    return sorted(anim_manager.animations)
+
+
+def _pack_animation(anim_manager, names):
+    animation = anim_manager.current_animation
+    if animation is None or anim_manager.current_name not in names:
+        return NO_ANIMATION, 0
+    return names.index(anim_manager.current_name), animation.start_tick
+
+
+def _unpack_animation(anim_manager, names, index, start_tick):
+    if index == NO_ANIMATION:
+        return
+    name = names[index]
+    anim_manager.current_name = name
+    anim_manager.current_animation = anim_manager.animations[name]
+    anim_manager.current_animation.start_tick = start_tick
+
+
+class SnapshotCodec:
+    """Упаковывает изменяемое состояние симуляции в запись фиксированного размера"""
+
+    def __init__(self, game):
+        self.game = game
+        self.npcs = list(game.npcs)  # порядок NPC фиксируется на уровень
+        self.player_animations = _animation_names(game.player.anim_manager)
+        self.npc_animations = [_animation_names(npc.anim_manager) for npc in self.npcs]
+        self.size = (HEADER.size + PLAYER.size + NPC.size * len(self.npcs)
+                     + PROJECTILE.size * SNAPSHOT_MAX_PROJECTILES
+                     + PARTICLE.size * SNAPSHOT_MAX_PARTICLES)
+
+    def encode_into(self, buffer, offset):
+        game = self.game
+        player = game.player
+        projectiles = list(player.projectiles)[:SNAPSHOT_MAX_PROJECTILES]
+        particles = player.particles[:SNAPSHOT_MAX_PARTICLES]
+
+        # Вместо полного состояния ГСЧ (2.5 КБ) храним 4 байта: пересеиваем генератор
+        seed = random.getrandbits(32)
+        random.seed(seed)
+
+        HEADER.pack_into(buffer, offset, shared_clock.ticks, seed,
+                         game.camera_x, game.camera_y, len(projectiles), len(particles))
+        offset += HEADER.size
+
+        anim_index, anim_start = _pack_animation(player.anim_manager, self.player_animations)
+        PLAYER.pack_into(buffer, offset, player.rect.x, player.rect.y,
+                         player.velocity_x, player.velocity_y,
+                         player.remainder_x, player.remainder_y,
+                         player.on_ground, player.facing_right,
+                         PLAYER_STATES.index(player.state),
+                         player.is_attacking, player.attack_triggered,
+                         anim_index, player.attack_cooldown, anim_start)
+        offset += PLAYER.size
+
+        for npc, names in zip(self.npcs, self.npc_animations):
+            anim_index, anim_start = _pack_animation(npc.anim_manager, names)
+            NPC.pack_into(buffer, offset, npc.rect.x, npc.rect.y,
+                          npc.velocity_x, npc.velocity_y,
+                          npc.remainder_x, npc.remainder_y,
+                          npc.on_ground, npc.dialog_shown, npc.dialog_active,
+                          npc.dialog_finished, anim_index,
+                          npc.text_index, npc.text_timer, npc.patrol_index, anim_start)
+            offset += NPC.size
+
+        for projectile in projectiles:
+            PROJECTILE.pack_into(buffer, offset, projectile.x, projectile.rect.centery,
+                                 projectile.velocity_x, projectile.lifetime)
+            offset += PROJECTILE.size
+        offset += PROJECTILE.size * (SNAPSHOT_MAX_PROJECTILES - len(projectiles))
+
+        for particle in particles:
+            PARTICLE.pack_into(buffer, offset, particle.x, particle.y, particle.vx, particle.vy,
+                               particle.lifetime, particle.max_lifetime, particle.size,
+                               *particle.color[:3])
+            offset += PARTICLE.size
+
+    def decode_from(self, buffer, offset):
+        game = self.game
+        player = game.player
+
+        ticks, seed, camera_x, camera_y, projectile_count, particle_count = \
+            HEADER.unpack_from(buffer, offset)
+        offset += HEADER.size
+        shared_clock.ticks = ticks
+        game.camera_x = camera_x
+        game.camera_y = camera_y
+
+        (player.rect.x, player.rect.y, player.velocity_x, player.velocity_y,
+         player.remainder_x, player.remainder_y, on_ground, facing_right, state_index,
+         is_attacking, attack_triggered, anim_index, player.attack_cooldown,
+         anim_start) = PLAYER.unpack_from(buffer, offset)
+        offset += PLAYER.size
+        player.on_ground = bool(on_ground)
+        player.facing_right = bool(facing_right)
+        player.state = PLAYER_STATES[state_index]
+        player.is_attacking = bool(is_attacking)
+        player.attack_triggered = bool(attack_triggered)
+        _unpack_animation(player.anim_manager, self.player_animations, anim_index, anim_start)
+        player.image = player.anim_manager.get_current_frame() or player.image
+
+        for npc, names in zip(self.npcs, self.npc_animations):
+            (npc.rect.x, npc.rect.y, npc.velocity_x, npc.velocity_y,
+             npc.remainder_x, npc.remainder_y, on_ground, dialog_shown, dialog_active,
+             dialog_finished, anim_index, npc.text_index, npc.text_timer,
+             npc.patrol_index, anim_start) = NPC.unpack_from(buffer, offset)
+            offset += NPC.size
+            npc.on_ground = bool(on_ground)
+            npc.dialog_shown = bool(dialog_shown)
+            npc.dialog_active = bool(dialog_active)
+            npc.dialog_finished = bool(dialog_finished)
+            npc.reset_path()
+            _unpack_animation(npc.anim_manager, names, anim_index, anim_start)
+
+            # Текст диалога восстанавливается по индексу, облако - только если оно видно
+            npc.current_text = npc.dialog_text[:npc.text_index]
+            if npc.dialog_active and npc.text_index > 0:
+                npc._render_cloud()
+            else:
+                npc.cloud_surface = None
+
+        player.projectiles.empty()
+        for _ in range(projectile_count):
+            x, center_y, velocity_x, lifetime = PROJECTILE.unpack_from(buffer, offset)
+            offset += PROJECTILE.size
+            projectile = Projectile(0, center_y, velocity_x > 0)
+            projectile.x = x
+            projectile.rect.x = int(x)
+            projectile.velocity_x = velocity_x
+            projectile.lifetime = lifetime
+            player.projectiles.add(projectile)
+        offset += PROJECTILE.size * (SNAPSHOT_MAX_PROJECTILES - projectile_count)
+
+        particles = []
+        for _ in range(particle_count):
+            x, y, vx, vy, lifetime, max_lifetime, size, r, g, b = PARTICLE.unpack_from(buffer, offset)
+            offset += PARTICLE.size
+            particle = Particle.__new__(Particle)  # без __init__: он тратит случайные числа
+            particle.x, particle.y, particle.vx, particle.vy = x, y, vx, vy
+            particle.lifetime, particle.max_lifetime, particle.size = lifetime, max_lifetime, size
+            particle.color = (r, g, b)
+            particles.append(particle)
+        player.particles = particles
+
+        random.seed(seed)
+
+
+class SnapshotHistory:
+    """Кольцевой буфер снимков в заранее выделенной памяти + снимок начала уровня"""
+
+    def __init__(self, game, capacity=SNAPSHOT_HISTORY, interval=SNAPSHOT_INTERVAL):
+        self.codec = SnapshotCodec(game)
+        self.capacity = capacity
+        self.interval = max(1, interval)
+        self.buffer = bytearray(self.codec.size * capacity)
+        self.initial = bytearray(self.codec.size)
+        self.codec.encode_into(self.initial, 0)
+        self.head = 0  # следующая ячейка для записи
+        self.count = 0
+        self._timer = 0
+
+    def record(self):
+        """Вызывается каждый тик, пишет снимок раз в interval тиков"""
+        self._timer += 1
+        if self._timer < self.interval:
+            return
+        self._timer = 0
+        self.codec.encode_into(self.buffer, self.head * self.codec.size)
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def step_back(self):
+        """Откатывает на один снимок назад. False - история кончилась"""
+        if self.count == 0:
+            return False
+        self.head = (self.head - 1) % self.capacity
+        self.count -= 1
+        # Последний снимок может совпадать с текущим состоянием - тогда берём предыдущий
+        if self.count > 0 and self._tick_at(self.head) == shared_clock.ticks:
+            self.head = (self.head - 1) % self.capacity
+            self.count -= 1
+        self.codec.decode_from(self.buffer, self.head * self.codec.size)
+        self._timer = 0
+        return True
+
+    def _tick_at(self, slot):
+        return HEADER.unpack_from(self.buffer, slot * self.codec.size)[0]
+
+    def restore_initial(self):
+        """Мгновенный рестарт уровня из начального снимка"""
+        self.codec.decode_from(self.initial, 0)
+        self.head = 0
+        self.count = 0
+        self._timer = 0
@@ -0,0 +1,65 @@
+import json
+import time
+from contextlib import contextmanager
+
+
+def init_pygame():
+    """Инициализирует только нужные подсистемы: дисплей (с событиями) и шрифты.
+    Звук и джойстики не трогаем - pygame.init() поднимал бы их все"""
+    import pygame
+
+    if not pygame.display.get_init():
+        pygame.display.init()
+    if not pygame.font.get_init():
+        pygame.font.init()
+
+
+class StartupProfiler:
+    """Профилировщик холодного старта: время от запуска процесса до первого кадра"""
+
+    def __init__(self, start=None):
+        self.start = start if start is not None else time.perf_counter()
+        # CPU, потраченный до первой строки main.py (запуск интерпретатора)
+        self.interpreter_cpu = time.process_time()
+        self.phases = {}
+        self.milestones = {}  # имя -> секунды от старта процесса
+
+    @contextmanager
+    def phase(self, name):
+        """Замеряет фазу; повторные фазы с тем же именем суммируются"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def mark(self, name):
+        """Отмечает момент (например, первый показанный кадр); повторные отметки игнорируются"""
+        if name not in self.milestones:
+            self.milestones[name] = time.perf_counter() - self.start
+
+    def to_dict(self):
+        total = self.milestones.get("first_frame", time.perf_counter() - self.start)
+        return {
+            "timestamp": time.time(),
+            "interpreter_cpu_ms": round(self.interpreter_cpu * 1000, 3),
+            "phases_ms": {name: round(value * 1000, 3) for name, value in self.phases.items()},
+            "milestones_ms": {name: round(value * 1000, 3) for name, value in self.milestones.items()},
+            "first_frame_ms": round(total * 1000, 3),
+        }
+
+    def format(self):
+        data = self.to_dict()
+        lines = [f"Холодный старт: {data['first_frame_ms']:.1f} мс до первого кадра"]
+        for name, value in data["phases_ms"].items():
+            lines.append(f"  {name:<16} {value:>9.1f} мс")
+        for name, value in data["milestones_ms"].items():
+            lines.append(f"  {'@' + name:<16} {value:>9.1f} мс")
+        return "\n".join(lines)
+
+    def write_report(self, path):
+        """Дописывает замер в JSON Lines файл для сравнения между сборками"""
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.to_dict(), ensure_ascii=False) + "\n")
+        return path
@@ -0,0 +1,72 @@
+import pygame
+from settings import SURFACE_COLORKEY, SURFACE_RLE_MIN_RUN_FRACTION
+
+# Классы поверхностей по прозрачности
+OPAQUE = "opaque"      # все пиксели непрозрачны: convert(), обычное копирование
+COLORKEY = "colorkey"  # пиксели либо полностью видны, либо полностью прозрачны
+ALPHA = "alpha"        # есть полупрозрачные пиксели: convert_alpha()
+SURFACE_CLASSES = (OPAQUE, COLORKEY, ALPHA)
+
+
+def _alpha_counts(surface):
+    """(видимых пикселей, полностью непрозрачных) - через маски, на стороне C"""
+    visible = pygame.mask.from_surface(surface, 0).count()
+    solid = pygame.mask.from_surface(surface, 254).count()
+    return visible, solid
+
+
+def classify(surface):
+    """Класс поверхности по её пикселям"""
+    if not surface.get_flags() & pygame.SRCALPHA:
+        return COLORKEY if surface.get_colorkey() is not None else OPAQUE
+    visible, solid = _alpha_counts(surface)
+    width, height = surface.get_size()
+    if solid == width * height:
+        return OPAQUE
+    return COLORKEY if solid == visible else ALPHA
+
+
+def _to_colorkey(surface, solid):
+    """Непрозрачная копия, где прозрачные пиксели залиты ключевым цветом.
+    None - ключевой цвет встречается среди видимых пикселей"""
+    keyed = pygame.Surface(surface.get_size()).convert()
+    keyed.fill(SURFACE_COLORKEY)
+    keyed.blit(surface, (0, 0))
+    width, height = surface.get_size()
+    key_pixels = pygame.mask.from_threshold(keyed, SURFACE_COLORKEY, (1, 1, 1, 255)).count()
+    if key_pixels != width * height - solid:
+        return None
+    keyed.set_colorkey(SURFACE_COLORKEY, pygame.RLEACCEL)
+    return keyed
+
+
+def prepare(surface):
+    """Переводит поверхность в формат дисплея под её класс.
+    Вызывать только в главном потоке; результат нельзя рисовать на месте -
+    RLE-поверхности распаковываются при каждой блокировке"""
+    if pygame.display.get_surface() is None:
+        return surface  # без окна конвертировать не во что
+
+    surface_class = classify(surface)
+    if surface_class == OPAQUE:
+        return surface.convert()
+
+    if surface_class == COLORKEY:
+        key = surface.get_colorkey()
+        if key is not None:
+            prepared = surface.convert()
+            prepared.set_colorkey(key, pygame.RLEACCEL)
+            return prepared
+        _, solid = _alpha_counts(surface)
+        prepared = _to_colorkey(surface, solid)
+        if prepared is not None:
+            return prepared
+
+    prepared = surface.convert_alpha()
+    # RLE выигрывает на длинных прозрачных и непрозрачных отрезках
+    visible, solid = _alpha_counts(prepared)
+    width, height = prepared.get_size()
+    runs = (width * height - visible) + solid
+    if runs >= width * height * SURFACE_RLE_MIN_RUN_FRACTION:
+        prepared.set_alpha(255, pygame.RLEACCEL)
+    return prepared